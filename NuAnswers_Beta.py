@@ -5,16 +5,23 @@ from datetime import datetime, timezone, timedelta
 import os
 import tempfile
 from pathlib import Path
-import PyPDF2
-import docx
-import pptx
-import csv
-import xlrd
-import openpyxl
-import io
 import base64
 from zoneinfo import ZoneInfo
 import re
+from event_log import append_events
+import telemetry
+from student_index import get_student_index
+from rollups import get_registration_rollup
+from retrieval import DocumentPassages, DocumentSearchIndex, DocumentTokens, PassageIndex, chunk_text, join_chunks, select_context
+from history import window_history
+from disk_cache import DiskCache, content_hash
+from ingestion import FILE_TIMEOUT_SECONDS, gather, submit_document, submit_image
+from extractors import TABLE_EXTENSIONS, read_table_rows
+from images import IMAGE_EXTENSIONS, make_thumbnail, prepare_image
+from document_store import DocumentStore
+from course_corpus import CourseCorpus
+from course_pack import MANIFEST_NAME, CoursePack
+from response_cache import get_response_cache
 
 # Set page config
 st.set_page_config(
@@ -121,10 +128,108 @@ COMPLETION_DATA_PATH = DATA_DIR / "completion_data.csv"
 RESPONSE_TIMES_PATH = DATA_DIR / "response_times.csv"
 CONTENT_ACCESS_PATH = DATA_DIR / "content_access.csv"
 RESOLUTION_TIMES_PATH = DATA_DIR / "resolution_times.csv"
+FEEDBACK_TRENDS_PATH = DATA_DIR / "feedback_trends.csv"
+STUDENT_INDEX_PATH = DATA_DIR / "registration_index.jsonl"
 
 # Create data directory if it doesn't exist
 DATA_DIR.mkdir(exist_ok=True)
 
+# Extracted document text, shared across sessions and keyed by file content hash.
+# Bump TEXT_CACHE_VERSION whenever extraction output changes.
+TEXT_CACHE_DIR = DATA_DIR / "text_cache"
+TEXT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+TEXT_CACHE_VERSION = 3
+
+@st.cache_resource
+def get_text_cache():
+    return DiskCache(TEXT_CACHE_DIR, TEXT_CACHE_MAX_BYTES, suffix=".txt")
+
+# Vision analysis text for uploaded images, keyed by the original image's hash.
+# Bump IMAGE_ANALYSIS_VERSION whenever the analysis prompt or model changes.
+IMAGE_ANALYSIS_CACHE_DIR = DATA_DIR / "image_analysis_cache"
+IMAGE_ANALYSIS_CACHE_MAX_BYTES = 16 * 1024 * 1024
+IMAGE_ANALYSIS_VERSION = 1
+
+@st.cache_resource
+def get_image_analysis_cache():
+    return DiskCache(IMAGE_ANALYSIS_CACHE_DIR, IMAGE_ANALYSIS_CACHE_MAX_BYTES, suffix=".txt")
+
+def image_analysis_cache_key(digest):
+    return f"v{IMAGE_ANALYSIS_VERSION}-{digest}"
+
+# Uploaded spreadsheets spill here after ingestion so row-range requests can
+# reread them; session state keeps only the compact extracted text
+UPLOAD_STORE_DIR = Path(tempfile.gettempdir()) / "nuanswers_uploads"
+UPLOAD_STORE_MAX_BYTES = 512 * 1024 * 1024
+
+@st.cache_resource
+def get_upload_store():
+    return DiskCache(UPLOAD_STORE_DIR, UPLOAD_STORE_MAX_BYTES)
+
+# Parsed documents shared by every session in a course, so a course packet
+# uploaded by many students is chunked, indexed and held in memory once
+@st.cache_resource
+def get_course_corpus():
+    return CourseCorpus()
+
+# Course packs pre-ingested with ingest_course_pack.py, one directory per course_id
+COURSE_PACKS_DIR = DATA_DIR / "course_packs"
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _open_course_pack(course_id, manifest_mtime):
+    return CoursePack(COURSE_PACKS_DIR / course_id)
+
+def get_course_pack(course_id):
+    """The course's pre-ingested pack, opened on first use; None if there is none.
+
+    Keyed on the manifest's mtime so a re-ingested pack is picked up without a restart.
+    """
+    if not course_id:
+        return None
+    try:
+        manifest_mtime = (COURSE_PACKS_DIR / course_id / MANIFEST_NAME).stat().st_mtime
+    except OSError:
+        return None
+    try:
+        return _open_course_pack(course_id, manifest_mtime)
+    except (OSError, ValueError) as e:
+        st.warning(f"Could not load course materials for {course_id}: {str(e)}")
+        return None
+
+# Document context sent with each chat turn: at most this many tokens of the
+# best-matching passages from the uploaded documents
+CONTEXT_TOKEN_BUDGET = 3000
+CONTEXT_TOP_K = 8
+
+# Bump TUTOR_PROMPT_VERSION whenever the prompt changes, so cached answers
+# written for the old prompt are no longer served
+TUTOR_PROMPT_VERSION = 1
+TUTOR_SYSTEM_PROMPT = """You are an Accounting & Finance Tutor. Your role is to guide students through their homework and exam preparation through a conversational, step-by-step approach.
+
+IMPORTANT RULES:
+1. NEVER give direct answers or solutions
+2. Ask ONE question at a time and wait for the student's response
+3. After each student response, ask a follow-up question to guide their thinking
+4. If the student's answer is incorrect, ask a guiding question to help them think differently
+5. If the student asks for the answer, respond with a question that helps them think about the problem differently
+6. Use simple, clear questions that build on each other
+7. Focus on one concept or step at a time
+8. Validate their understanding before moving to the next step
+9. Use encouraging phrases like "Good thinking!" or "You're on the right track!"
+10. If the student seems stuck, ask a simpler question that breaks down the problem
+11. Use the context from uploaded documents to provide more relevant guidance
+
+Example of good tutoring:
+Student: "How do I solve this problem?"
+Tutor: "Let's start with the first step. What information do we have in the problem?"
+Student: [responds]
+Tutor: "Good! Now, what do you think we should do with this information?"
+[continue with one question at a time]
+
+Example of bad tutoring:
+"Here's how to solve it: First, do this, then do that, then calculate this..."
+[giving multiple steps at once]"""
+
 # Initialize all session state variables
 if "registered" not in st.session_state:
     st.session_state.registered = False
@@ -141,8 +246,11 @@ if "registration_data" not in st.session_state:
         "timestamp", "full_name", "student_id", "student_email", "grade", "campus",
         "major", "course_name", "course_id", "professor", "professor_email", "usage_time_minutes"
     ])
-if "uploaded_documents" not in st.session_state:
-    st.session_state.uploaded_documents = []
+if "document_store" not in st.session_state:
+    st.session_state.document_store = DocumentStore()
+# Bumped after each batch of uploads to clear the uploader, so Streamlit drops its copy of the files
+if "uploader_generation" not in st.session_state:
+    st.session_state.uploader_generation = 0
 if "search_query" not in st.session_state:
     st.session_state.search_query = ""
 if "doc_to_delete" not in st.session_state:
@@ -167,25 +275,26 @@ if "content_access" not in st.session_state:
     st.session_state.content_access = []
 if "resolution_times" not in st.session_state:
     st.session_state.resolution_times = []
+if "feedback_trends" not in st.session_state:
+    st.session_state.feedback_trends = []
+if "history_summary" not in st.session_state:
+    st.session_state.history_summary = ""  # Rolling summary of messages outside the history window
+if "history_summarized" not in st.session_state:
+    st.session_state.history_summarized = 0  # Number of messages already folded into the summary
 
 def save_to_csv(data, filepath):
-    """Save data to CSV file with error handling"""
+    """Append data to a CSV event log with error handling"""
     try:
-        # Convert to DataFrame if it's a dictionary
+        # Normalize to a list of row dicts
         if isinstance(data, dict):
-            df = pd.DataFrame([data])
+            rows = [data]
         elif isinstance(data, list):
-            df = pd.DataFrame(data)
+            rows = data
         else:
-            df = data
-            
-        # Load existing data if file exists
-        if filepath.exists():
-            existing_df = pd.read_csv(filepath)
-            df = pd.concat([existing_df, df], ignore_index=True)
-        
-        # Save to CSV
-        df.to_csv(filepath, index=False)
+            rows = data.to_dict("records")
+
+        # Append only; never re-read or rewrite the existing file
+        append_events(filepath, rows)
     except Exception as e:
         st.error(f"Failed to save data to {filepath}: {str(e)}")
 
@@ -215,40 +324,27 @@ def save_registration(user_data, start_time):
         "usage_time_minutes": usage_time
     }
     save_to_csv(new_registration, REGISTRATION_DATA_PATH)
+    try:
+        get_student_index(STUDENT_INDEX_PATH, REGISTRATION_DATA_PATH).record(new_registration)
+    except Exception as e:
+        st.error(f"Failed to update student lookup index: {str(e)}")
 
 
 def lookup_student_from_csv(student_id, student_email):
-    """Return account dict for returning user from CSV, or None if not found."""
-    if not REGISTRATION_DATA_PATH.exists():
-        return None
+    """Return account dict for returning user from the registration index, or None if not found."""
     try:
-        df = pd.read_csv(REGISTRATION_DATA_PATH)
-        if df.empty or "student_id" not in df.columns:
-            return None
-        email_col = "student_email" if "student_email" in df.columns else "email"
-        if email_col not in df.columns:
-            return None
-        mask = (df["student_id"].astype(str).str.strip() == str(student_id).strip()) & (
-            df[email_col].astype(str).str.strip().str.lower() == str(student_email).strip().lower()
-        )
-        matches = df.loc[mask]
-        if matches.empty:
-            return None
-        row = matches.iloc[-1]
-        return {
-            "full_name": row.get("full_name", ""),
-            "student_id": str(row.get("student_id", "")),
-            "student_email": str(row.get(email_col, "")),
-            "grade": row.get("grade", ""),
-            "campus": row.get("campus", ""),
-            "major": row.get("major", ""),
-            "course_name": "",
-            "course_id": "",
-            "professor": "",
-            "professor_email": "",
-        }
+        account = get_student_index(STUDENT_INDEX_PATH, REGISTRATION_DATA_PATH).lookup(student_id, student_email)
     except Exception:
         return None
+    if account is None:
+        return None
+    return {
+        **account,
+        "course_name": "",
+        "course_id": "",
+        "professor": "",
+        "professor_email": "",
+    }
 
 def track_content_access(content_id, content_type):
     """Track content access patterns"""
@@ -259,7 +355,7 @@ def track_content_access(content_id, content_type):
         "user_id": st.session_state.user_data.get("full_name")
     }
     st.session_state.content_access.append(entry)
-    save_to_csv(entry, CONTENT_ACCESS_PATH)
+    telemetry.record(CONTENT_ACCESS_PATH, entry)
 
 def track_resolution_time(start_time, end_time, topic):
     """Track problem resolution time"""
@@ -271,7 +367,54 @@ def track_resolution_time(start_time, end_time, topic):
         "user_id": st.session_state.user_data.get("full_name")
     }
     st.session_state.resolution_times.append(entry)
-    save_to_csv(entry, RESOLUTION_TIMES_PATH)
+    telemetry.record(RESOLUTION_TIMES_PATH, entry)
+
+def save_feedback(rating, topic, difficulty):
+    """Save feedback data"""
+    et_tz = ZoneInfo("America/New_York")
+    feedback_entry = {
+        "timestamp": datetime.now(et_tz).strftime("%Y-%m-%d %H:%M:%S"),
+        "course_id": st.session_state.user_data.get("course_id"),
+        "rating": rating,
+        "topic": topic,
+        "difficulty": difficulty
+    }
+    st.session_state.feedback_data.append(feedback_entry)
+    save_to_csv(feedback_entry, FEEDBACK_DATA_PATH)
+
+def track_topic(topic, difficulty=None):
+    """Track topic data"""
+    et_tz = ZoneInfo("America/New_York")
+    topic_entry = {
+        "timestamp": datetime.now(et_tz).strftime("%Y-%m-%d %H:%M:%S"),
+        "course_id": st.session_state.user_data.get("course_id"),
+        "topic": topic,
+        "difficulty": difficulty
+    }
+    st.session_state.topic_data.append(topic_entry)
+    save_to_csv(topic_entry, TOPIC_DATA_PATH)
+
+def track_completion(completed):
+    """Track course completion"""
+    et_tz = ZoneInfo("America/New_York")
+    completion_entry = {
+        "timestamp": datetime.now(et_tz).strftime("%Y-%m-%d %H:%M:%S"),
+        "course_id": st.session_state.user_data.get("course_id"),
+        "completed": completed
+    }
+    st.session_state.completion_data.append(completion_entry)
+    save_to_csv(completion_entry, COMPLETION_DATA_PATH)
+
+def track_feedback_trend(satisfaction_score, suggestions=None):
+    """Track feedback trends over time"""
+    entry = {
+        "date": datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d"),
+        "satisfaction_score": satisfaction_score,
+        "suggestions": suggestions,
+        "user_id": st.session_state.user_data.get("full_name")
+    }
+    st.session_state.feedback_trends.append(entry)
+    save_to_csv(entry, FEEDBACK_TRENDS_PATH)
 
 # Create a sidebar
 with st.sidebar:
@@ -362,7 +505,10 @@ if not st.session_state.registered:
                 save_registration(st.session_state.user_data, st.session_state.start_time)
                 try:
                     from supabase_db import save_registration_data
-                    save_registration_data(st.session_state.user_data, st.session_state.start_time)
+                    row = save_registration_data(st.session_state.user_data, st.session_state.start_time)
+                    # Update the dashboard rollups now rather than when an admin next loads the page
+                    if row:
+                        get_registration_rollup().record(row)
                 except Exception:
                     pass
                 st.session_state.registered = True
@@ -405,95 +551,83 @@ elif st.session_state.registered and not st.session_state.chat_started:
                 st.session_state.messages = [
                     {"role": "assistant", "content": "Hello! I'm NuAnswers. I'm here to help you understand concepts and work through problems. What would you like to work on today?"}
                 ]
+                st.session_state.history_summary = ""
+                st.session_state.history_summarized = 0
                 st.rerun()
 
-# Function to extract text from different file types
-def extract_text_from_file(file):
-    file_extension = Path(file.name).suffix.lower()
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-        tmp_file.write(file.getvalue())
-        tmp_file_path = tmp_file.name
-    
-    try:
-        if file_extension == '.pdf':
-            text = extract_text_from_pdf(tmp_file_path)
-        elif file_extension == '.docx':
-            text = extract_text_from_docx(tmp_file_path)
-        elif file_extension == '.txt':
-            with open(tmp_file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-        elif file_extension == '.pptx':
-            text = extract_text_from_pptx(tmp_file_path)
-        elif file_extension == '.csv':
-            text = extract_text_from_csv(tmp_file_path)
-        elif file_extension in ['.xls', '.xlsx']:
-            text = extract_text_from_excel(tmp_file_path)
-        else:
-            st.error(f"Unsupported file type: {file_extension}")
-            return None
-    except Exception as e:
-        st.error(f"Error processing file: {str(e)}")
-        return None
-    finally:
-        os.unlink(tmp_file_path)
-    
-    return text
-
-def extract_text_from_pdf(file_path):
-    text = ""
-    with open(file_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-    return text
-
-def extract_text_from_docx(file_path):
-    doc = docx.Document(file_path)
-    return "\n".join([paragraph.text for paragraph in doc.paragraphs])
-
-def extract_text_from_pptx(file_path):
-    prs = pptx.Presentation(file_path)
-    text = ""
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                text += shape.text + "\n"
-    return text
-
-def extract_text_from_csv(file_path):
-    text = ""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            text += ", ".join(row) + "\n"
-    return text
-
-def extract_text_from_excel(file_path):
-    text = ""
-    try:
-        # Read all sheets
-        excel_file = pd.ExcelFile(file_path)
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(excel_file, sheet_name=sheet_name)
-            text += f"\nSheet: {sheet_name}\n"
-            text += df.to_string(index=False) + "\n"
-    except Exception as e:
-        st.error(f"Error reading Excel file: {str(e)}")
-        return None
-    return text
+# Extracted text is cached by file content; parsing itself lives in extractors.py
+def text_cache_key(digest):
+    return f"v{TEXT_CACHE_VERSION}-{digest}"
+
+# Large spreadsheets are summarized at upload; a prompt like "rows 100-120"
+# pulls those rows from the original file in the upload store
+ROW_RANGE_PATTERN = re.compile(r"\brows?\s+(\d+)\s*(?:-|to|through)\s*(\d+)", re.IGNORECASE)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def table_rows(file_name, digest, start, stop, _data):
+    """Rows start..stop of an uploaded table (digest keys the cache instead of hashing _data)"""
+    return read_table_rows(file_name, _data, start, stop)
+
+def requested_table_rows(prompt, documents):
+    """Row text from tabular uploads for any row ranges named in prompt"""
+    parts = []
+    for match in ROW_RANGE_PATTERN.finditer(prompt):
+        start, stop = sorted((int(match.group(1)), int(match.group(2))))
+        for doc in documents:
+            if Path(doc['name']).suffix.lower() in TABLE_EXTENSIONS:
+                data = get_upload_store().get(doc['hash'])
+                if data is None:
+                    continue  # evicted from the upload store
+                rows = table_rows(doc['name'], doc['hash'], start, stop, data)
+                if rows:
+                    parts.append(f"Document: {doc['name']}\n{rows}")
+    return parts
 
 # Function to search within documents
+def get_search_index():
+    """Return the session's document search index, adding newly uploaded documents and dropping deleted ones"""
+    if "search_index" not in st.session_state:
+        st.session_state.search_index = DocumentSearchIndex()
+    index = st.session_state.search_index
+    store = st.session_state.document_store
+    for key in index.keys():
+        if key not in store:
+            index.remove_document(key)
+    for doc in store:
+        if doc['hash'] not in index:
+            index.add_document(doc['hash'], tokens=doc['tokens'])
+    return index
+
 def search_in_documents(query, documents):
-    if not query:
-        return documents
-    query = query.lower()
+    """Return [(document, highlight offsets)] for documents matching query, best match first"""
+    if not query.strip():
+        return [(doc, []) for doc in documents]
+    by_key = {doc['hash']: doc for doc in documents}
     results = []
+    name_query = query.strip().lower()
+    matched = set()
     for doc in documents:
-        if query in doc['name'].lower() or query in doc['content'].lower():
-            results.append(doc)
+        if name_query in doc['name'].lower():
+            results.append((doc, []))
+            matched.add(doc['hash'])
+    for _, key, highlights in get_search_index().search(query):
+        if key in by_key and key not in matched:
+            results.append((by_key[key], highlights))
     return results
 
+def highlight_text(content, highlights):
+    """Bold the given (start, end) character ranges of content for markdown"""
+    parts = []
+    last = 0
+    for start, end in highlights:
+        if start < last:
+            continue
+        parts.append(content[last:start])
+        parts.append(f"**{content[start:end]}**")
+        last = end
+    parts.append(content[last:])
+    return "".join(parts)
+
 # Main application logic for registered users who have started a chat (entered course details)
 if st.session_state.registered and st.session_state.chat_started:
     # Show the introduction message once at the top
@@ -540,6 +674,15 @@ if st.session_state.registered and st.session_state.chat_started:
                     else:
                         track_feedback_trend(rating)
                     
+                    # Send feedback, topic and completion to Supabase in the background, batched with
+                    # other students' logouts, so logging out never waits on (or fails with) the database
+                    from supabase_db import save_event_batch, feedback_row, topic_row, completion_row
+                    student_id = st.session_state.user_data.get("student_id")
+                    course_id = st.session_state.user_data.get("course_id")
+                    telemetry.record(save_event_batch, ("feedback", feedback_row(rating, topic, difficulty, student_id, course_id)))
+                    telemetry.record(save_event_batch, ("topics", topic_row(topic, difficulty, student_id, course_id)))
+                    telemetry.record(save_event_batch, ("completions", completion_row(True, student_id, course_id)))
+                    
                     st.session_state.feedback_submitted = True
                     st.rerun()
                 else:
@@ -610,75 +753,181 @@ if st.session_state.registered and st.session_state.chat_started:
     client = OpenAI(api_key=openai_api_key)
 
     # Move these two functions above the file upload section
-    def encode_image_to_base64(file):
-        """Convert uploaded image file to base64 string"""
-        return base64.b64encode(file.getvalue()).decode('utf-8')
-
-    def analyze_image(file):
-        """Analyze image content using OpenAI's GPT-4 Vision model"""
-        try:
-            base64_image = encode_image_to_base64(file)
-            response = client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": "Please analyze this image in the context of accounting, finance, or business studies. Describe any relevant equations, problems, charts, or concepts shown."},
-                            {
-                                "type": "image_url",
-                                "image_url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=300
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            st.error(f"Error analyzing image: {str(e)}")
-            return None
+    def encode_image_to_base64(data):
+        """Convert uploaded image bytes to base64 string"""
+        return base64.b64encode(data).decode('utf-8')
+
+    def analyze_image(data):
+        """Analyze image content using OpenAI's GPT-4 Vision model.
+
+        The image is downscaled and recompressed before sending. Runs on an
+        ingestion worker thread, so errors are raised for the
+        upload loop to report rather than shown here.
+        """
+        image_data, mime_type = prepare_image(data)
+        base64_image = encode_image_to_base64(image_data)
+        response = client.with_options(timeout=FILE_TIMEOUT_SECONDS).chat.completions.create(
+            model="gpt-4-vision-preview",
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "Please analyze this image in the context of accounting, finance, or business studies. Describe any relevant equations, problems, charts, or concepts shown."},
+                        {
+                            "type": "image_url",
+                            "image_url": f"data:{mime_type};base64,{base64_image}"
+                        }
+                    ]
+                }
+            ],
+            max_tokens=300
+        )
+        return response.choices[0].message.content
+
+    def get_passage_index():
+        """Return the session's passage index, regrouping the documents' prebuilt postings when documents change"""
+        docs = st.session_state.document_store.documents
+        key = tuple(doc['hash'] for doc in docs)
+        if st.session_state.get("passage_index_key") != key:
+            index = PassageIndex()
+            for doc in docs:
+                index.add_document(doc['name'], passages=doc['passages'])
+            st.session_state.passage_index = index
+            st.session_state.passage_index_key = key
+        return st.session_state.passage_index
+
+    # Pre-ingested materials for this course, loaded the first time any student opens it
+    course_pack = get_course_pack(st.session_state.user_data.get("course_id"))
 
     # File upload section
     st.subheader("📄 Upload Course Materials")
+    if course_pack is not None:
+        st.caption(f"📘 {len(course_pack.documents)} course document(s) for {course_pack.course_id} are already available to the tutor.")
     uploaded_files = st.file_uploader(
         "Upload your course materials (PDF, DOCX, TXT, PPTX, CSV, XLS, XLSX, PNG, JPG, JPEG)",
         type=['pdf', 'docx', 'txt', 'pptx', 'csv', 'xls', 'xlsx', 'png', 'jpg', 'jpeg'],
-        accept_multiple_files=True
+        accept_multiple_files=True,
+        key=f"uploader_{st.session_state.uploader_generation}"
     )
+    # Messages from the batch ingested just before the uploader was cleared
+    for level, message in st.session_state.pop("upload_messages", []):
+        getattr(st, level)(message)
     
     if uploaded_files:
+        store = st.session_state.document_store
+        course_id = st.session_state.user_data.get("course_id") or ""
+        messages = []
+        # Skip content already in the session, even if uploaded under another name.
+        # UploadedFile is unhashable, so new files are tracked by content hash, in upload order
+        new_files = {}
         for file in uploaded_files:
-            if file not in [doc['file'] for doc in st.session_state.uploaded_documents]:
-                file_extension = Path(file.name).suffix.lower()
-                
-                # Handle image files differently
-                if file_extension in ['.png', '.jpg', '.jpeg']:
-                    # Analyze image content
-                    image_analysis = analyze_image(file)
-                    
-                    st.session_state.uploaded_documents.append({
-                        'file': file,
-                        'name': file.name,
-                        'content': f"[Image Analysis: {image_analysis}]" if image_analysis else f"[Image File: {file.name}]",
-                        'is_image': True,
-                        'image_analysis': image_analysis
-                    })
-                    st.success(f"Successfully uploaded and analyzed image {file.name}")
+            digest = content_hash(file.getvalue())
+            if digest not in store and digest not in new_files:
+                new_files[digest] = file
+        # Parse documents in the process pool and analyze images in the thread pool,
+        # so a batch takes about as long as its slowest file
+        results = {}
+        futures = {}
+        for digest, file in new_files.items():
+            data = file.getvalue()
+            if Path(file.name).suffix.lower() in IMAGE_EXTENSIONS:
+                image_analysis = get_image_analysis_cache().get_text(image_analysis_cache_key(digest))
+                if image_analysis is not None:
+                    results[digest] = (image_analysis, None)
                 else:
-                    text = extract_text_from_file(file)
-                    if text:
-                        st.session_state.uploaded_documents.append({
-                            'file': file,
-                            'name': file.name,
-                            'content': text,
-                            'is_image': False
-                        })
-                        st.success(f"Successfully processed {file.name}")
+                    futures[submit_image(analyze_image, data)] = digest
+                continue
+            shared = get_course_corpus().get(course_id, digest)
+            if shared is not None:
+                results[digest] = (shared, None)
+                continue
+            text = get_text_cache().get_text(text_cache_key(digest))
+            if text is not None:
+                results[digest] = (text, None)
+            else:
+                futures[submit_document(file.name, data)] = digest
+
+        if futures:
+            progress = st.progress(0.0, text=f"Processing {len(futures)} file(s)...")
+            for done, (digest, result, error) in enumerate(gather(futures), start=1):
+                results[digest] = (result, error)
+                file = new_files[digest]
+                if result and Path(file.name).suffix.lower() in IMAGE_EXTENSIONS:
+                    get_image_analysis_cache().put_text(image_analysis_cache_key(digest), result)
+                elif result:
+                    get_text_cache().put_text(text_cache_key(digest), result)
+                progress.progress(done / len(futures), text=f"Processed {file.name} ({done}/{len(futures)})")
+            progress.empty()
+
+        # Add documents in upload order, whichever finished first
+        for digest, file in new_files.items():
+            result, error = results[digest]
+            file_extension = Path(file.name).suffix.lower()
+            if file_extension in IMAGE_EXTENSIONS:
+                if error:
+                    messages.append(("error", f"Error analyzing image {file.name}: {str(error)}"))
+                image_analysis = result
+                content = f"[Image Analysis: {image_analysis}]" if image_analysis else f"[Image File: {file.name}]"
+                try:
+                    thumbnail = make_thumbnail(file.getvalue())
+                except Exception:
+                    thumbnail = None
+                passages = DocumentPassages(chunk_text(content))
+                doc = {
+                    'name': file.name,
+                    'hash': digest,
+                    'chunks': passages.chunks,
+                    'passages': passages,
+                    'tokens': DocumentTokens(join_chunks(passages.chunks)),
+                    'is_image': True,
+                    'image_analysis': image_analysis,
+                    'thumbnail': thumbnail
+                }
+                success = f"Successfully uploaded and analyzed image {file.name}"
+            elif error:
+                messages.append(("error", f"Error processing file {file.name}: {str(error)}"))
+                continue
+            elif result:
+                if file_extension in TABLE_EXTENSIONS:
+                    get_upload_store().put(digest, file.getvalue())
+                if isinstance(result, str):
+                    result = get_course_corpus().publish(course_id, file.name, digest, chunk_text(result))
+                # The chunks and indexes are the corpus's shared objects, not copies
+                doc = {
+                    'name': file.name,
+                    'hash': digest,
+                    'chunks': result.chunks,
+                    'passages': result.passages,
+                    'tokens': result.tokens,
+                    'shared': True,
+                    'is_image': False
+                }
+                success = f"Successfully processed {file.name}"
+            else:
+                continue
+            for evicted in store.add(doc):
+                messages.append(("warning", f"Removed {evicted['name']} to stay within this session's memory limit"))
+            messages.append(("success", success))
+        # Index new documents for the search box now rather than on the first keystroke
+        get_search_index()
+        # Clear the uploader so the raw files are not held for the rest of the session
+        st.session_state.upload_messages = messages
+        st.session_state.uploader_generation += 1
+        st.rerun()
     
     # Search and document management section
-    if st.session_state.uploaded_documents:
+    if st.session_state.document_store:
         st.subheader("📚 Your Uploaded Materials")
+        report = st.session_state.document_store.memory_report()
+        st.caption(
+            f"{report['documents']} document(s) ({report['shared']} shared with your course) "
+            f"using {report['total_bytes'] / (1024 * 1024):.1f} MB "
+            f"of {report['cap_bytes'] / (1024 * 1024):.0f} MB session memory "
+            f"(text {report['text_bytes'] / (1024 * 1024):.1f} MB, "
+            f"indexes {report['index_bytes'] / (1024 * 1024):.1f} MB, "
+            f"image previews {report['thumbnail_bytes'] / (1024 * 1024):.1f} MB; "
+            f"{report['shared_bytes'] / (1024 * 1024):.1f} MB of it shared)"
+        )
         
         # Search bar
         search_col, reorder_col = st.columns([3, 1])
@@ -695,7 +944,7 @@ if st.session_state.registered and st.session_state.chat_started:
         # Reorder interface
         if getattr(st.session_state, 'show_reorder', False):
             st.info("Drag and drop documents to reorder them")
-            for i, doc in enumerate(st.session_state.uploaded_documents):
+            for i, doc in enumerate(st.session_state.document_store.documents):
                 cols = st.columns([1, 4, 1])
                 with cols[0]:
                     st.write(f"{i+1}.")
@@ -703,57 +952,45 @@ if st.session_state.registered and st.session_state.chat_started:
                     st.write(doc['name'])
                 with cols[2]:
                     if st.button("↑", key=f"up_{i}") and i > 0:
-                        st.session_state.uploaded_documents[i], st.session_state.uploaded_documents[i-1] = \
-                            st.session_state.uploaded_documents[i-1], st.session_state.uploaded_documents[i]
+                        st.session_state.document_store.move(i, -1)
                         st.rerun()
-                    if st.button("↓", key=f"down_{i}") and i < len(st.session_state.uploaded_documents) - 1:
-                        st.session_state.uploaded_documents[i], st.session_state.uploaded_documents[i+1] = \
-                            st.session_state.uploaded_documents[i+1], st.session_state.uploaded_documents[i]
+                    if st.button("↓", key=f"down_{i}") and i < len(st.session_state.document_store) - 1:
+                        st.session_state.document_store.move(i, 1)
                         st.rerun()
         
         # Display filtered documents
-        filtered_docs = search_in_documents(st.session_state.search_query, st.session_state.uploaded_documents)
+        filtered_docs = search_in_documents(st.session_state.search_query, st.session_state.document_store.documents)
         
         if not filtered_docs:
             st.info("No documents match your search query.")
         else:
-            for i, doc in enumerate(filtered_docs):
+            for i, (doc, highlights) in enumerate(filtered_docs):
                 cols = st.columns([4, 1])
                 with cols[0].expander(doc['name']):
                     if doc.get('is_image', False):
-                        st.image(doc['file'], caption=doc['name'])
+                        if doc.get('thumbnail'):
+                            st.image(doc['thumbnail'], caption=doc['name'])
                         if doc.get('image_analysis'):
                             st.markdown("**Image Analysis:**")
                             st.markdown(doc['image_analysis'])
                     else:
                         # Highlight search terms in content
-                        content = doc['content']
-                        if st.session_state.search_query:
-                            query = st.session_state.search_query.lower()
-                            start = content.lower().find(query)
-                            if start != -1:
-                                end = start + len(query)
-                                highlighted = (
-                                    content[:start] +
-                                    f"**{content[start:end]}**" +
-                                    content[end:]
-                                )
-                                st.markdown(highlighted)
-                            else:
-                                st.text(content[:500] + "..." if len(content) > 500 else content)
+                        if highlights:
+                            st.markdown(highlight_text(st.session_state.document_store.text(doc), highlights))
                         else:
-                            st.text(content[:500] + "..." if len(content) > 500 else content)
+                            preview = join_chunks(doc['chunks'][:3])
+                            st.text(preview[:500] + "..." if len(preview) > 500 else preview)
                 
                 # Delete button with confirmation
                 if cols[1].button("🗑️", key=f"delete_{i}"):
-                    st.session_state.doc_to_delete = doc
+                    st.session_state.doc_to_delete = doc['hash']
                 
                 # Confirmation dialog
-                if st.session_state.doc_to_delete == doc:
+                if st.session_state.doc_to_delete == doc['hash']:
                     st.warning(f"Are you sure you want to delete {doc['name']}?")
                     confirm_cols = st.columns(2)
                     if confirm_cols[0].button("Yes, delete it", key=f"confirm_delete_{i}"):
-                        st.session_state.uploaded_documents.remove(doc)
+                        st.session_state.document_store.remove(doc['hash'])
                         st.session_state.doc_to_delete = None
                         st.rerun()
                     if confirm_cols[1].button("Cancel", key=f"cancel_delete_{i}"):
@@ -784,62 +1021,74 @@ if st.session_state.registered and st.session_state.chat_started:
                 "user_id": st.session_state.user_data.get("full_name")
             }
             st.session_state.response_times.append(entry)
-            save_to_csv(entry, RESPONSE_TIMES_PATH)
+            telemetry.record(RESPONSE_TIMES_PATH, entry)
 
-        # Prepare context from uploaded documents
+        # Prepare context from the uploaded and course pack passages most relevant to this prompt
         context = ""
-        if st.session_state.uploaded_documents:
-            context = "\n\n".join([f"Document: {doc['name']}\nContent: {doc['content']}" 
-                                 for doc in st.session_state.uploaded_documents])
-            context = f"Here is the context from uploaded documents:\n\n{context}\n\n"
-
-        # Generate a response using the OpenAI API
-        stream = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": f"""You are an Accounting & Finance Tutor. Your role is to guide students through their homework and exam preparation through a conversational, step-by-step approach.
+        indexes = []
+        if st.session_state.document_store:
+            indexes.append(get_passage_index())
+        if course_pack is not None:
+            indexes.append(course_pack)
+        if indexes:
+            passages = select_context(indexes, prompt, CONTEXT_TOKEN_BUDGET, CONTEXT_TOP_K)
+            context = "\n\n".join([f"Document: {name}\nExcerpt: {passage}" for name, passage in passages])
+            context = f"Here are the most relevant excerpts from the uploaded documents:\n\n{context}\n\n"
+            used_names = {name for name, _ in passages}
+            for doc in st.session_state.document_store:
+                if doc['name'] in used_names:
+                    st.session_state.document_store.touch(doc['hash'])
+            table_parts = requested_table_rows(prompt, st.session_state.document_store.documents)
+            if table_parts:
+                context += "Requested table rows:\n\n" + "\n\n".join(table_parts) + "\n\n"
 
-IMPORTANT RULES:
-1. NEVER give direct answers or solutions
-2. Ask ONE question at a time and wait for the student's response
-3. After each student response, ask a follow-up question to guide their thinking
-4. If the student's answer is incorrect, ask a guiding question to help them think differently
-5. If the student asks for the answer, respond with a question that helps them think about the problem differently
-6. Use simple, clear questions that build on each other
-7. Focus on one concept or step at a time
-8. Validate their understanding before moving to the next step
-9. Use encouraging phrases like "Good thinking!" or "You're on the right track!"
-10. If the student seems stuck, ask a simpler question that breaks down the problem
-11. Use the context from uploaded documents to provide more relevant guidance
-
-Example of good tutoring:
-Student: "How do I solve this problem?"
-Tutor: "Let's start with the first step. What information do we have in the problem?"
-Student: [responds]
-Tutor: "Good! Now, what do you think we should do with this information?"
-[continue with one question at a time]
+        # Keep the request under the history budget: recent messages plus a summary of older ones
+        history_messages, st.session_state.history_summary, st.session_state.history_summarized = window_history(
+            st.session_state.messages,
+            st.session_state.history_summary,
+            st.session_state.history_summarized
+        )
 
-Example of bad tutoring:
-"Here's how to solve it: First, do this, then do that, then calculate this..."
-[giving multiple steps at once]"""},
-                {"role": "system", "content": context},
-                *[{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
-            ],
-            stream=True,
+        # A course's common opening questions are answered from the shared response cache.
+        # Only the first turn without personal uploads qualifies, since later turns depend on the conversation
+        course_id = st.session_state.user_data.get("course_id") or ""
+        cacheable = (
+            not st.session_state.document_store
+            and sum(1 for message in st.session_state.messages if message["role"] == "user") == 1
         )
+        # Answers are also tied to the course pack build they were written with
+        prompt_version = (TUTOR_PROMPT_VERSION, course_pack.manifest["created"] if course_pack is not None else None)
+        response = get_response_cache().get(course_id, prompt_version, prompt) if cacheable else None
 
-        # Stream the response
-        with st.chat_message("assistant"):
-            response = st.write_stream(stream)
+        if response is not None:
+            with st.chat_message("assistant"):
+                st.markdown(response)
+        else:
+            # Generate a response using the OpenAI API
+            stream = client.chat.completions.create(
+                model="gpt-4.1",
+                messages=[
+                    {"role": "system", "content": TUTOR_SYSTEM_PROMPT},
+                    {"role": "system", "content": context},
+                    *history_messages
+                ],
+                stream=True,
+            )
+
+            # Stream the response
+            with st.chat_message("assistant"):
+                response = st.write_stream(stream)
+            if cacheable:
+                get_response_cache().put(course_id, prompt_version, prompt, response)
         st.session_state.messages.append({"role": "assistant", "content": response})
 
         response_end_time = datetime.now(ZoneInfo("America/New_York"))
         track_response_time(response_start_time, response_end_time)
         
         # Track content access if documents are referenced
-        if st.session_state.uploaded_documents:
+        if st.session_state.document_store:
             try:
-                for doc in st.session_state.uploaded_documents:
+                for doc in st.session_state.document_store:
                     track_content_access(doc['name'], 'document' if not doc.get('is_image') else 'image')
             except NameError:
                 pass  # track_content_access not in scope (e.g. some Streamlit run contexts)
@@ -859,6 +1108,8 @@ Example of bad tutoring:
         st.session_state.messages = [
             {"role": "assistant", "content": "Hello! I'm NuAnswers. I'm here to help you understand concepts and work through problems. What would you like to work on today?"}
         ]
+        st.session_state.history_summary = ""
+        st.session_state.history_summarized = 0
         st.rerun()
     # Add a logout button at the top of the main content
     if st.sidebar.button("Logout"):
@@ -904,42 +1155,6 @@ def show_admin_panel():
     except Exception as e:
         st.error(f"Error loading registration data: {str(e)}")
 
-def save_feedback(rating, topic, difficulty):
-    """Save feedback data"""
-    et_tz = ZoneInfo("America/New_York")
-    feedback_entry = {
-        "timestamp": datetime.now(et_tz).strftime("%Y-%m-%d %H:%M:%S"),
-        "course_id": st.session_state.user_data.get("course_id"),
-        "rating": rating,
-        "topic": topic,
-        "difficulty": difficulty
-    }
-    st.session_state.feedback_data.append(feedback_entry)
-    save_to_csv(feedback_entry, FEEDBACK_DATA_PATH)
-
-def track_topic(topic, difficulty=None):
-    """Track topic data"""
-    et_tz = ZoneInfo("America/New_York")
-    topic_entry = {
-        "timestamp": datetime.now(et_tz).strftime("%Y-%m-%d %H:%M:%S"),
-        "course_id": st.session_state.user_data.get("course_id"),
-        "topic": topic,
-        "difficulty": difficulty
-    }
-    st.session_state.topic_data.append(topic_entry)
-    save_to_csv(topic_entry, TOPIC_DATA_PATH)
-
-def track_completion(completed):
-    """Track course completion"""
-    et_tz = ZoneInfo("America/New_York")
-    completion_entry = {
-        "timestamp": datetime.now(et_tz).strftime("%Y-%m-%d %H:%M:%S"),
-        "course_id": st.session_state.user_data.get("course_id"),
-        "completed": completed
-    }
-    st.session_state.completion_data.append(completion_entry)
-    save_to_csv(completion_entry, COMPLETION_DATA_PATH)
-
 def track_system_status(status, start_time, end_time=None):
     """Track system uptime and status"""
     if end_time is None:
@@ -954,17 +1169,6 @@ def track_system_status(status, start_time, end_time=None):
     st.session_state.system_status.append(entry)
     save_to_csv(entry, SYSTEM_STATUS_PATH)
 
-def track_feedback_trend(satisfaction_score, suggestions=None):
-    """Track feedback trends over time"""
-    entry = {
-        "date": datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d"),
-        "satisfaction_score": satisfaction_score,
-        "suggestions": suggestions,
-        "user_id": st.session_state.user_data.get("full_name")
-    }
-    st.session_state.feedback_trends.append(entry)
-    save_to_csv(entry, FEEDBACK_TRENDS_PATH)
-
 def track_yearly_data():
     """Track yearly performance metrics"""
     current_year = datetime.now(ZoneInfo("America/New_York")).year
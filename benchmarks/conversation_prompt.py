@@ -0,0 +1,97 @@
+"""Prompt size per turn over long synthetic tutoring conversations.
+
+Usage:
+    python benchmarks/conversation_prompt.py [--turns 200] [--every 10]
+
+Replays a conversation through window_history and select_context the way
+the chat page builds each request (system prompt, document excerpts,
+windowed history), and reports the estimated prompt tokens per turn next
+to what sending the full history would cost. The system prompt and budgets
+are read from NuAnswers_Beta.py without running the app.
+"""
+import argparse
+import ast
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from history import HISTORY_TOKEN_BUDGET, window_history  # noqa: E402
+from retrieval import PassageIndex, chunk_text, estimate_tokens, select_context  # noqa: E402
+
+TOPICS = ["depreciation", "accrual", "journal entry", "balance sheet", "cash flow", "inventory",
+          "present value", "bond premium", "lease liability", "retained earnings"]
+WORDS = ("the a of to and in for is on that with as it by this be are from at or an which "
+         "asset liability equity revenue expense debit credit account period cost value rate").split()
+
+
+def app_constants(names):
+    """Values of module-level constants assigned in NuAnswers_Beta.py"""
+    tree = ast.parse((ROOT / "NuAnswers_Beta.py").read_text(encoding="utf-8"))
+    values = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            if node.targets[0].id in names:
+                values[node.targets[0].id] = ast.literal_eval(node.value)
+    return values
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_message(rng, role):
+    topic = rng.choice(TOPICS)
+    if role == "user":
+        return f"Can you help me with {topic}? " + " ".join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(1, 4)))
+    return f"Let's work through {topic} step by step. " + " ".join(sentence(rng, rng.randint(10, 25)) for _ in range(rng.randint(4, 12)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200, help="Student messages per conversation")
+    parser.add_argument("--every", type=int, default=10, help="Print every Nth turn")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    constants = app_constants({"TUTOR_SYSTEM_PROMPT", "CONTEXT_TOKEN_BUDGET", "CONTEXT_TOP_K"})
+    system_tokens = estimate_tokens(constants["TUTOR_SYSTEM_PROMPT"])
+    rng = random.Random(args.seed)
+    index = PassageIndex()
+    for topic in TOPICS:
+        index.add_document(f"{topic}.pdf", chunk_text(" ".join(f"{topic} " + sentence(rng, 20) for _ in range(300))))
+
+    messages = []
+    summary, summarized = "", 0
+    largest = 0
+    elapsed = 0.0
+    print(f"System prompt {system_tokens} tokens, context budget {constants['CONTEXT_TOKEN_BUDGET']}, "
+          f"history budget {HISTORY_TOKEN_BUDGET}")
+    print(f"{'turn':>5} {'context':>8} {'history':>8} {'prompt':>8} {'full history':>13}")
+    for turn in range(1, args.turns + 1):
+        prompt = synthetic_message(rng, "user")
+        messages.append({"role": "user", "content": prompt})
+        start = time.perf_counter()
+        passages = select_context(index, prompt, constants["CONTEXT_TOKEN_BUDGET"], constants["CONTEXT_TOP_K"])
+        history, summary, summarized = window_history(messages, summary, summarized)
+        elapsed += time.perf_counter() - start
+        context_tokens = sum(estimate_tokens(f"Document: {name}\nExcerpt: {passage}") for name, passage in passages)
+        history_tokens = sum(estimate_tokens(message["content"]) for message in history)
+        full_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        total = system_tokens + context_tokens + history_tokens
+        largest = max(largest, total)
+        if turn == 1 or turn % args.every == 0 or turn == args.turns:
+            print(f"{turn:>5} {context_tokens:>8} {history_tokens:>8} {total:>8} "
+                  f"{system_tokens + context_tokens + full_tokens:>13}")
+        messages.append({"role": "assistant", "content": synthetic_message(rng, "assistant")})
+
+    print(f"Largest prompt {largest} tokens; building context and history took "
+          f"{elapsed / args.turns * 1000:.2f} ms per turn on average")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
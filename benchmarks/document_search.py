@@ -0,0 +1,83 @@
+"""Search-box latency over 20 large documents: DocumentSearchIndex vs. substring scan.
+
+Usage:
+    python benchmarks/document_search.py [--documents 20] [--words 150000]
+
+Builds the per-document token indexes once (as upload does), then replays
+a query being typed one keystroke at a time. Each keystroke is timed with
+the index and with the old approach, which lowercased every document,
+scanned it for the query, and lowercased it again to find a highlight.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from retrieval import DocumentSearchIndex, DocumentTokens  # noqa: E402
+
+COMMON = ("the a of to and in for is on that with as it by this be are from at or an which "
+          "asset liability equity revenue expense debit credit account period cost value rate").split()
+RARE = ("depreciation amortization impairment goodwill accrual deferral consolidation lease "
+        "straight-line declining-balance schedule variance budget").split()
+
+
+def synthetic_document(rng, words):
+    vocabulary = COMMON + [f"term{i}" for i in range(5000)]
+    tokens = [rng.choice(RARE) if rng.random() < 0.002 else rng.choice(vocabulary) for _ in range(words)]
+    return " ".join(tokens).capitalize() + "."
+
+
+def substring_search(query, documents):
+    """The search box before the index"""
+    query = query.lower()
+    results = []
+    for name, content in documents.items():
+        if query in name.lower() or query in content.lower():
+            results.append((name, content.lower().find(query)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--words", type=int, default=150000, help="Words per document")
+    parser.add_argument("--query", default="depreciation schedule")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    documents = {f"chapter_{i + 1}.pdf": synthetic_document(rng, args.words) for i in range(args.documents)}
+    text_mb = sum(len(text) for text in documents.values()) / 1024 ** 2
+
+    start = time.perf_counter()
+    tokens = {name: DocumentTokens(text) for name, text in documents.items()}
+    build = time.perf_counter() - start
+    index = DocumentSearchIndex()
+    for name, document_tokens in tokens.items():
+        index.add_document(name, tokens=document_tokens)
+    index_mb = sum(document_tokens.nbytes for document_tokens in tokens.values()) / 1024 ** 2
+
+    print(f"{args.documents} documents, {text_mb:.1f} MB of text; index built in {build:.2f}s "
+          f"({build / args.documents * 1000:.0f} ms per upload), {index_mb:.1f} MB")
+    print(f"{'query':<24} {'index':>9} {'scan':>9} {'index hits':>11} {'scan hits':>10}")
+    index_times, scan_times = [], []
+    for length in range(3, len(args.query) + 1):
+        query = args.query[:length]
+        start = time.perf_counter()
+        hits = index.search(query)
+        index_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        scanned = substring_search(query, documents)
+        scan_times.append(time.perf_counter() - start)
+        print(f"{query!r:<24} {index_times[-1] * 1000:>7.2f}ms {scan_times[-1] * 1000:>7.1f}ms "
+              f"{len(hits):>11} {len(scanned):>10}")
+    print(f"Median per keystroke: index {statistics.median(index_times) * 1000:.2f} ms, "
+          f"scan {statistics.median(scan_times) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
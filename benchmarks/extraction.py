@@ -0,0 +1,127 @@
+"""Extraction time and peak memory for a 500-page PDF and a 100k-row CSV.
+
+Usage:
+    python benchmarks/extraction.py [--pages 500] [--rows 100000]
+
+Compares the current extractors, which yield segments and join once, with
+the earlier loops that grew the output with `text += ...`. Peak memory is
+measured with tracemalloc. The PDF runs with PDF_NO_LIMITS so both sides
+extract every page.
+"""
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import PyPDF2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from extractors import PDF_NO_LIMITS, extract_text_from_csv, extract_text_from_pdf, iter_csv_text  # noqa: E402
+
+WORDS = "asset liability equity revenue expense debit credit account period cost value rate".split()
+
+
+def synthetic_pdf(pages, lines_per_page=45, seed=0):
+    """A text PDF with one Helvetica content stream per page"""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+        commands = [b"BT /F1 10 Tf 12 TL 40 780 Td"]
+        commands.extend(b"(" + f"Page {page + 1}: {line}".encode("latin-1") + b") '" for line in lines)
+        commands.append(b"ET")
+        stream = b"\n".join(commands)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.writelines(b"%010d 00000 n \n" % offset for offset in offsets)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def synthetic_csv(rows, seed=0):
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["student_id", "name", "assignment", "score", "submitted"])
+    for row in range(rows):
+        writer.writerow([10000000 + row % 5000, f"Student {row % 5000}", f"HW {row % 20 + 1}",
+                         round(rng.uniform(0, 100), 1), f"2024-{row % 12 + 1:02d}-15"])
+    return out.getvalue().encode("utf-8")
+
+
+def pdf_concatenated(data):
+    """PDF extraction before: one += per page"""
+    text = ""
+    for page in PyPDF2.PdfReader(io.BytesIO(data), strict=False).pages:
+        text += page.extract_text() or ""
+    return text
+
+
+def csv_concatenated(data):
+    """CSV extraction before: one += per row"""
+    text = ""
+    with io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            text += ", ".join(row) + "\n"
+    return text
+
+
+def measure(function, data):
+    """(seconds, peak MB above the start, output characters)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = function(data)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2, len(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    pdf = synthetic_pdf(args.pages)
+    table = synthetic_csv(args.rows)
+    cases = [
+        (f"PDF {args.pages} pages, += per page", pdf_concatenated, pdf),
+        (f"PDF {args.pages} pages, join once", lambda data: extract_text_from_pdf(io.BytesIO(data), **PDF_NO_LIMITS), pdf),
+        (f"CSV {args.rows} rows, += per row", csv_concatenated, table),
+        (f"CSV {args.rows} rows, join once", lambda data: "".join(iter_csv_text(io.BytesIO(data))), table),
+        (f"CSV {args.rows} rows, summarized", lambda data: extract_text_from_csv(io.BytesIO(data)), table),
+    ]
+    print(f"PDF input {len(pdf) / 1024 ** 2:.1f} MB, CSV input {len(table) / 1024 ** 2:.1f} MB")
+    print(f"{'':<36} {'time':>8} {'peak memory':>12} {'output chars':>13}")
+    for name, function, data in cases:
+        elapsed, peak, chars = measure(function, data)
+        print(f"{name:<36} {elapsed:>7.2f}s {peak:>10.1f}MB {chars:>13}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Admin dashboard render time vs. registration row count, with and without rollups.
+
+Usage:
+    python benchmarks/rollup_render.py [--rows 1000 10000 100000 1000000]
+
+For each row count it times the dashboard's registration metrics computed
+from the raw rows (what every render used to do) against reading them from
+a RegistrationRollup, and reports the rollup's build time and size.
+"""
+import argparse
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rollups import ROLLUP_DIMENSIONS, RegistrationRollup, check_rollup  # noqa: E402
+
+
+class _Table:
+    """Stand-in for an IncrementalTable that has loaded frame"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.generation = 1
+
+
+def synthetic_registrations(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-01-01")
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "timestamp": start + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, rows), unit="s"),
+        "student_id": rng.integers(0, max(rows // 5, 1), rows).astype(str),
+        "campus": rng.choice(["Florham", "Metropolitan", "Vancouver"], rows),
+        "major": rng.choice(["Accounting", "Finance", "Economics", "MIS", "Marketing", "Management"], rows),
+        "grade": rng.choice(["Freshman", "Sophomore", "Junior", "Senior", "Graduate"], rows),
+        "course_name": rng.choice([f"Course {i}" for i in range(40)], rows),
+        "course_id": rng.choice([f"ACCT_{2000 + i}_01" for i in range(40)], rows),
+        "professor": rng.choice([f"Professor {i}" for i in range(25)], rows),
+        "usage_time_minutes": rng.exponential(20, rows),
+    })
+
+
+def render_from_raw(df):
+    """The registration metrics as computed from raw rows on every render"""
+    usage = df['usage_time_minutes']
+    usage.sum(), usage.mean(), df['student_id'].nunique()
+    for column in ROLLUP_DIMENSIONS:
+        df[column].value_counts()
+    df.groupby([df['timestamp'].dt.day_name(), df['timestamp'].dt.hour]).size().unstack()
+    pd.crosstab(df['major'], df['grade'])
+    df.groupby(['grade', 'major'])['usage_time_minutes'].agg(['mean', 'count'])
+    df.groupby('major')['usage_time_minutes'].agg(['mean', 'count'])
+
+
+def render_from_rollup(rollup):
+    rollup.totals()
+    for column in ROLLUP_DIMENSIONS:
+        rollup.distribution(column)
+    rollup.peak_usage()
+    rollup.crosstab('major', 'grade')
+    rollup.usage_by(['grade', 'major'])
+    rollup.usage_by('major')
+
+
+def best_of(repeat, function, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>9} {'raw render':>11} {'rollup render':>14} {'rollup build':>13} "
+          f"{'rollup size':>12} {'raw size':>10}")
+    for rows in args.rows:
+        df = synthetic_registrations(rows)
+        rollup = RegistrationRollup()
+        start = time.perf_counter()
+        rollup.sync(_Table(df))
+        build = time.perf_counter() - start
+        problems = check_rollup(rollup, df)
+        if problems:
+            print(f"{rows}: rollup differs from raw data: {'; '.join(problems)}", file=sys.stderr)
+            return 1
+        raw = best_of(args.repeat, render_from_raw, df)
+        rolled = best_of(args.repeat, render_from_rollup, rollup)
+        size = len(pickle.dumps((rollup.by_hour, rollup.by_dimension, rollup.by_major_grade, rollup.students.registers)))
+        print(f"{rows:>9} {raw * 1000:>9.1f}ms {rolled * 1000:>12.1f}ms {build * 1000:>11.1f}ms "
+              f"{size / 1024:>10.0f}KB {df.memory_usage(deep=True).sum() / 1024 ** 2:>8.1f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Returning-student lookup with 100k synthetic registrations.
+
+Usage:
+    python benchmarks/student_lookup.py [--rows 100000] [--lookups 1000]
+
+Writes a synthetic registration_data.csv to a temporary directory, then
+times a login lookup done the old way (read and normalize the whole CSV)
+against StudentIndex: the one-time bootstrap, lookups of existing students,
+and lookups right after new registrations are recorded.
+"""
+import argparse
+import csv
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from student_index import StudentIndex  # noqa: E402
+
+FIELDS = ["timestamp", "full_name", "student_id", "student_email", "grade", "campus", "major",
+          "course_name", "course_id", "professor", "professor_email", "usage_time_minutes"]
+
+
+def synthetic_registration(rng, number):
+    student = rng.randrange(max(number // 4, 1) + 1)
+    return {
+        "timestamp": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00",
+        "full_name": f"Student {student}",
+        "student_id": str(10000000 + student),
+        "student_email": f"Student{student}@student.fdu.edu",
+        "grade": rng.choice(["Freshman", "Sophomore", "Junior", "Senior", "Graduate"]),
+        "campus": rng.choice(["Florham", "Metropolitan", "Vancouver"]),
+        "major": rng.choice(["Accounting", "Finance", "Economics", "MIS"]),
+        "course_name": "Intermediate Accounting",
+        "course_id": "ACCT_3021_01",
+        "professor": "Professor",
+        "professor_email": "professor@fdu.edu",
+        "usage_time_minutes": rng.uniform(1, 60),
+    }
+
+
+def csv_scan_lookup(path, student_id, student_email):
+    """The lookup before the index: read and normalize every row"""
+    df = pd.read_csv(path)
+    mask = (df["student_id"].astype(str).str.strip() == str(student_id).strip()) & (
+        df["student_email"].astype(str).str.strip().str.lower() == str(student_email).strip().lower()
+    )
+    matches = df.loc[mask]
+    return None if matches.empty else matches.iloc[-1].to_dict()
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--scans", type=int, default=5, help="Lookups timed with the full CSV scan")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        registrations = Path(directory) / "registration_data.csv"
+        rows = [synthetic_registration(rng, args.rows) for _ in range(args.rows)]
+        with open(registrations, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        students = [(row["student_id"], row["student_email"].upper()) for row in rng.sample(rows, args.lookups)]
+
+        scan_times = [timed(csv_scan_lookup, registrations, *student)[0] for student in students[:args.scans]]
+
+        index = StudentIndex(Path(directory) / "student_index.jsonl", registrations)
+        bootstrap, _ = timed(index.lookup, *students[0])
+        lookup_times = []
+        for student in students:
+            elapsed, account = timed(index.lookup, *student)
+            if account is None:
+                print(f"Lookup failed for {student}", file=sys.stderr)
+                return 1
+            lookup_times.append(elapsed)
+
+        after_record = []
+        for number in range(100):
+            registration = synthetic_registration(rng, args.rows)
+            registration["student_id"] = str(90000000 + number)
+            index.record(registration)
+            elapsed, account = timed(index.lookup, registration["student_id"], registration["student_email"])
+            if account is None:
+                print(f"Recorded student {registration['student_id']} not found", file=sys.stderr)
+                return 1
+            after_record.append(elapsed)
+
+    print(f"{args.rows} registrations")
+    print(f"CSV scan per lookup:          {statistics.median(scan_times) * 1000:9.2f} ms")
+    print(f"Index bootstrap (first use):  {bootstrap * 1000:9.2f} ms")
+    print(f"Index lookup:                 {statistics.median(lookup_times) * 1000:9.4f} ms")
+    print(f"Index lookup after a record:  {statistics.median(after_record) * 1000:9.4f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+from retrieval import DocumentPassages, DocumentTokens, join_chunks
+
+# Memory the shared corpus may use before the least recently used documents are dropped
+CORPUS_MAX_BYTES = 256 * 1024 * 1024
+
+# An immutable parsed document shared by every session in a course: the
+# retrieval chunks, their BM25 postings and the search box's token index are
+# built once, and sessions' indexes hold references to them instead of copies
+SharedDocument = namedtuple("SharedDocument", ["name", "hash", "chunks", "passages", "tokens", "size"])
+
+
+def shared_document(name, digest, chunks):
+    passages = DocumentPassages(chunks)
+    tokens = DocumentTokens(join_chunks(passages.chunks))
+    size = sum(sys.getsizeof(chunk) for chunk in passages.chunks) + passages.nbytes + tokens.nbytes
+    return SharedDocument(name, digest, passages.chunks, passages, tokens, size)
+
+
+class CourseCorpus:
+    """Process-wide parsed documents, grouped by course_id and keyed by content hash.
+
+    When students in the same course upload the same course packet, the
+    first upload is parsed and published here. Later sessions find it by
+    hash and reference the same SharedDocument, so memory and parsing scale
+    with distinct documents rather than with students. Only identical bytes
+    match, so a document is never shown to a session that did not upload it.
+    """
+
+    def __init__(self, max_bytes=CORPUS_MAX_BYTES):
+        self._max_bytes = max_bytes
+        self._documents = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, course_id, digest):
+        with self._lock:
+            document = self._documents.get((course_id, digest))
+            if document is None:
+                self.misses += 1
+                return None
+            self._documents.move_to_end((course_id, digest))
+            self.hits += 1
+            return document
+
+    def publish(self, course_id, name, digest, chunks):
+        """Add a parsed document and return the shared copy (an existing one wins)"""
+        document = shared_document(name, digest, chunks)
+        with self._lock:
+            existing = self._documents.get((course_id, digest))
+            if existing is not None:
+                return existing
+            self._documents[(course_id, digest)] = document
+            self._size += document.size
+            while self._size > self._max_bytes and len(self._documents) > 1:
+                # Sessions still referencing a dropped document keep it alive
+                _, dropped = self._documents.popitem(last=False)
+                self._size -= dropped.size
+        return document
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "courses": len({course_id for course_id, _ in self._documents}),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,180 @@
+import bisect
+import json
+import mmap
+import os
+import shutil
+import sys
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+
+from retrieval import bm25_rank
+
+# On-disk layout of a pre-ingested course pack, one directory per course_id:
+#   manifest.json          documents, counts and format details
+#   terms.json             sorted vocabulary; a term's id is its position
+#   text.bin               UTF-8 passage text, back to back
+#   chunk_offsets.bin      uint64 byte offset of each passage in text.bin (+1 end)
+#   chunk_lengths.bin      uint32 indexed term count of each passage
+#   postings_offsets.bin   uint64 start of each term's postings (+1 end)
+#   postings_passages.bin  uint32 passage ids, grouped by term
+#   postings_freqs.bin     uint32 term frequency for each posting
+# The .bin files are memory-mapped, so a loaded pack costs little more than
+# its vocabulary and is shared by every session in the process.
+PACK_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+_ARRAYS = {
+    "chunk_offsets": "Q",
+    "chunk_lengths": "I",
+    "postings_offsets": "Q",
+    "postings_passages": "I",
+    "postings_freqs": "I",
+}
+
+
+def write_pack(directory, course_id, documents, skipped=()):
+    """Write a course pack for documents, a list of (name, hash, chunks, chunk terms).
+
+    The pack is built in a sibling temp directory and swapped into place,
+    so the app never reads a half-written pack.
+    """
+    directory = Path(directory)
+    build_dir = directory.with_name(directory.name + ".building")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    build_dir.mkdir(parents=True)
+
+    chunk_offsets = array("Q", [0])
+    chunk_lengths = array("I")
+    postings = {}
+    manifest_documents = []
+    with open(build_dir / "text.bin", "wb") as text_file:
+        for name, digest, chunks, terms in documents:
+            manifest_documents.append({
+                "name": name,
+                "hash": digest,
+                "first_chunk": len(chunk_lengths),
+                "chunk_count": len(chunks),
+            })
+            for chunk, chunk_counts in zip(chunks, terms):
+                passage_id = len(chunk_lengths)
+                encoded = chunk.encode("utf-8")
+                text_file.write(encoded)
+                chunk_offsets.append(chunk_offsets[-1] + len(encoded))
+                chunk_lengths.append(sum(chunk_counts.values()))
+                for term, freq in chunk_counts.items():
+                    postings.setdefault(term, []).append((passage_id, freq))
+
+    vocabulary = sorted(postings)
+    postings_offsets = array("Q", [0])
+    postings_passages = array("I")
+    postings_freqs = array("I")
+    for term in vocabulary:
+        for passage_id, freq in postings[term]:
+            postings_passages.append(passage_id)
+            postings_freqs.append(freq)
+        postings_offsets.append(len(postings_passages))
+
+    arrays = {
+        "chunk_offsets": chunk_offsets,
+        "chunk_lengths": chunk_lengths,
+        "postings_offsets": postings_offsets,
+        "postings_passages": postings_passages,
+        "postings_freqs": postings_freqs,
+    }
+    for name, values in arrays.items():
+        with open(build_dir / f"{name}.bin", "wb") as f:
+            values.tofile(f)
+    with open(build_dir / "terms.json", "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f)
+    manifest = {
+        "format_version": PACK_FORMAT_VERSION,
+        "course_id": course_id,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "byteorder": sys.byteorder,
+        "passages": len(chunk_lengths),
+        "terms": len(vocabulary),
+        "documents": manifest_documents,
+        "skipped": [{"name": name, "error": error} for name, error in skipped],
+    }
+    with open(build_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if directory.exists():
+        old_dir = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(directory, old_dir)
+        os.replace(build_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    else:
+        os.replace(build_dir, directory)
+    return manifest
+
+
+class _PackPassages:
+    """Sequence of (document name, passage text) read from the mapped text file"""
+
+    def __init__(self, pack):
+        self._pack = pack
+        self._starts = [doc["first_chunk"] for doc in pack.documents]
+
+    def __len__(self):
+        return len(self._pack.chunk_lengths)
+
+    def __getitem__(self, passage_id):
+        pack = self._pack
+        doc = pack.documents[bisect.bisect_right(self._starts, passage_id) - 1]
+        start, end = pack.chunk_offsets[passage_id], pack.chunk_offsets[passage_id + 1]
+        return doc["name"], str(pack.text[start:end], "utf-8")
+
+
+class CoursePack:
+    """Read-only, memory-mapped course pack written by write_pack.
+
+    Offers the same search()/passages interface as PassageIndex, so it can
+    be passed to select_context next to a session's own index.
+    """
+
+    def __init__(self, directory):
+        directory = Path(directory)
+        with open(directory / MANIFEST_NAME, encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != PACK_FORMAT_VERSION:
+            raise ValueError(f"Unsupported course pack format in {directory}")
+        if self.manifest.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Course pack {directory} was written on a machine with different byte order")
+        self.course_id = self.manifest["course_id"]
+        self.documents = self.manifest["documents"]
+        with open(directory / "terms.json", encoding="utf-8") as f:
+            self._term_ids = {term: i for i, term in enumerate(json.load(f))}
+        self._maps = []
+        self.text = self._map(directory / "text.bin")
+        for name, typecode in _ARRAYS.items():
+            setattr(self, name, self._map(directory / f"{name}.bin").cast(typecode))
+        self.passages = _PackPassages(self)
+        self._total_length = sum(self.chunk_lengths)
+
+    def _map(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped)
+
+    def document_starts(self):
+        """[(first passage id, passage count)] for each document, from the manifest"""
+        return [(doc["first_chunk"], doc["chunk_count"]) for doc in self.documents]
+
+    def _postings(self, term):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            return None
+        start, end = self.postings_offsets[term_id], self.postings_offsets[term_id + 1]
+        lengths = self.chunk_lengths
+        return [(passage_id, freq, lengths[passage_id])
+                for passage_id, freq in zip(self.postings_passages[start:end], self.postings_freqs[start:end])]
+
+    def search(self, query, top_k=None):
+        """Return [(score, passage id)] for passages matching query, best first."""
+        return bm25_rank(query, len(self.chunk_lengths), self._total_length, self._postings, top_k)
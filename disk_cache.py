@@ -0,0 +1,80 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+
+def content_hash(data):
+    """SHA-256 hex digest of bytes, used as the cache key for uploaded files."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DiskCache:
+    """Size-bounded key -> bytes cache stored as one file per entry.
+
+    Reads bump the file's mtime, and when the directory grows past max_bytes
+    the least recently used entries are deleted. Writes go through a temp file
+    and os.replace so concurrent readers never see a partial entry.
+    """
+
+    def __init__(self, directory, max_bytes, suffix=".bin"):
+        self._directory = str(directory)
+        self._max_bytes = max_bytes
+        self._suffix = suffix
+        self._lock = threading.Lock()
+        self._size = None
+        os.makedirs(self._directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + self._suffix)
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith(self._suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(data)
+            if self._size > self._max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until under 90% of max_bytes."""
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self._max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def get_text(self, key):
+        data = self.get(key)
+        return data.decode("utf-8") if data is not None else None
+
+    def put_text(self, key, text):
+        self.put(key, text.encode("utf-8"))
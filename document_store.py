@@ -0,0 +1,115 @@
+import sys
+from collections import OrderedDict
+
+from retrieval import join_chunks
+
+# Memory one session's documents may use before the least recently used are evicted
+SESSION_MEMORY_CAP_BYTES = 32 * 1024 * 1024
+
+
+def text_size(doc):
+    return sum(sys.getsizeof(chunk) for chunk in doc.get('chunks', ()))
+
+
+def index_size(doc):
+    """Memory of the document's passage postings and search-box token index"""
+    size = 0
+    for key in ('passages', 'tokens'):
+        if doc.get(key) is not None:
+            size += doc[key].nbytes
+    return size
+
+
+def document_size(doc):
+    """Approximate memory held by a stored document, in bytes.
+
+    Covers the chunks, both indexes built over them, the thumbnail and the
+    image analysis. Chunks and indexes shared with the course corpus are
+    still charged, since the session's reference keeps them alive after the
+    corpus drops them.
+    """
+    size = text_size(doc) + index_size(doc)
+    size += len(doc.get('thumbnail') or b"")
+    size += sys.getsizeof(doc.get('image_analysis') or "")
+    return size
+
+
+class DocumentStore:
+    """Per-session uploaded documents, kept compact.
+
+    A document is a dict with its name, content hash, retrieval chunks, the
+    passage and search indexes over them and, for images, a thumbnail and
+    the analysis text. Neither the uploaded bytes
+    nor a second full copy of the text are kept; the full text is rebuilt
+    from the chunks when needed. Documents stay in upload order (which the
+    student can change) and are also tracked by recent use. When the total
+    passes memory_cap, the least recently used documents are evicted.
+    """
+
+    def __init__(self, memory_cap=SESSION_MEMORY_CAP_BYTES):
+        self.documents = []
+        self.memory_cap = memory_cap
+        self._by_hash = {}
+        self._recent = OrderedDict()
+
+    def __contains__(self, digest):
+        return digest in self._by_hash
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def get(self, digest):
+        return self._by_hash.get(digest)
+
+    def add(self, doc):
+        """Store doc and return the documents evicted to make room for it"""
+        doc['size'] = document_size(doc)
+        self.documents.append(doc)
+        self._by_hash[doc['hash']] = doc
+        self._recent[doc['hash']] = None
+        evicted = []
+        while self.memory_usage() > self.memory_cap and len(self._recent) > 1:
+            oldest = next(iter(self._recent))
+            evicted.append(self._by_hash[oldest])
+            self.remove(oldest)
+        return evicted
+
+    def remove(self, digest):
+        doc = self._by_hash.pop(digest, None)
+        if doc is not None:
+            self.documents.remove(doc)
+            self._recent.pop(digest, None)
+
+    def move(self, index, offset):
+        """Swap the document at index with its neighbour offset places away"""
+        other = index + offset
+        if 0 <= other < len(self.documents):
+            self.documents[index], self.documents[other] = self.documents[other], self.documents[index]
+
+    def touch(self, digest):
+        """Mark a document as recently used so eviction keeps it longer"""
+        if digest in self._recent:
+            self._recent.move_to_end(digest)
+
+    def text(self, doc):
+        return join_chunks(doc['chunks'])
+
+    def memory_usage(self):
+        return sum(doc['size'] for doc in self.documents)
+
+    def memory_report(self):
+        """Counts and bytes held by this session's documents"""
+        return {
+            "documents": len(self.documents),
+            "images": sum(1 for doc in self.documents if doc.get('is_image')),
+            "shared": sum(1 for doc in self.documents if doc.get('shared')),
+            "text_bytes": sum(text_size(doc) for doc in self.documents),
+            "index_bytes": sum(index_size(doc) for doc in self.documents),
+            "shared_bytes": sum(doc['size'] for doc in self.documents if doc.get('shared')),
+            "thumbnail_bytes": sum(len(doc.get('thumbnail') or b"") for doc in self.documents),
+            "total_bytes": self.memory_usage(),
+            "cap_bytes": self.memory_cap,
+        }
@@ -0,0 +1,92 @@
+import csv
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to the in-process lock only
+    fcntl = None
+
+# flock() only serializes separate processes; Streamlit sessions share one
+# process, so threads also need an in-process lock per file.
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _lock_for(filepath):
+    key = os.path.abspath(filepath)
+    with _path_locks_guard:
+        if key not in _path_locks:
+            _path_locks[key] = threading.Lock()
+        return _path_locks[key]
+
+
+@contextmanager
+def locked_file(filepath, mode="a+"):
+    """Open a file holding both the thread lock and an exclusive flock on it."""
+    with _lock_for(filepath):
+        with open(filepath, mode, newline="", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                if fcntl is not None:
+                    f.flush()
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _ordered_columns(rows):
+    columns = []
+    seen = set()
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+    return columns
+
+
+def _rewrite_with_columns(f, header):
+    """Rewrite the file with a widened header (only when a new column first appears)."""
+    f.seek(0)
+    existing = list(csv.DictReader(f))
+    f.seek(0)
+    f.truncate()
+    writer = csv.DictWriter(f, fieldnames=header, restval="")
+    writer.writeheader()
+    writer.writerows(existing)
+
+
+def append_events(filepath, rows):
+    """Append rows (list of dicts) to a CSV file, writing the header only once.
+
+    Each call costs O(rows appended) instead of O(file size). If a row carries
+    a column the file has never seen, the file is rewritten once with the
+    wider header so older rows keep lining up.
+    """
+    rows = [row for row in rows if row]
+    if not rows:
+        return
+    with locked_file(filepath) as f:
+        f.seek(0)
+        header = next(csv.reader(f), None)
+        columns = _ordered_columns(rows)
+        if not header:
+            header = columns
+            f.seek(0, os.SEEK_END)
+            csv.DictWriter(f, fieldnames=header).writeheader()
+        else:
+            new_columns = [c for c in columns if c not in header]
+            if new_columns:
+                header = header + new_columns
+                _rewrite_with_columns(f, header)
+        f.seek(0, os.SEEK_END)
+        writer = csv.DictWriter(f, fieldnames=header, restval="")
+        writer.writerows(rows)
+
+
+def append_event(filepath, row):
+    """Append a single row (dict) to a CSV event log."""
+    append_events(filepath, [row])
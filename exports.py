@@ -0,0 +1,78 @@
+import gzip
+import io
+
+import pandas as pd
+
+# Rows serialized per chunk when writing CSV exports
+EXPORT_CHUNK_ROWS = 50000
+# Built export files kept per process; each can be several MB
+EXPORT_CACHE_SIZE = 8
+
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Format name -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Excel": ("xlsx", EXCEL_MIME),
+}
+if PARQUET_AVAILABLE:
+    EXPORT_FORMATS["Parquet"] = ("parquet", "application/vnd.apache.parquet")
+
+
+def csv_bytes(df, compress=False):
+    """Serialize df as CSV in row chunks, optionally gzip-compressed.
+
+    Writing chunk by chunk into the (compressed) buffer avoids building the
+    whole CSV as one Python string first.
+    """
+    buffer = io.BytesIO()
+    raw = gzip.GzipFile(fileobj=buffer, mode="wb") if compress else buffer
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    if df.empty:
+        df.to_csv(text, index=False)
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(text, index=False, header=start == 0)
+    text.flush()
+    text.detach()
+    if compress:
+        raw.close()
+    return buffer.getvalue()
+
+
+def excel_bytes(sheets):
+    """Write a dict of sheet name -> DataFrame into one workbook."""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for sheet_name, data_df in sheets.items():
+            # Excel cannot store timezone-aware datetimes
+            data_df = data_df.copy(deep=False)
+            for column in data_df.select_dtypes(include=['datetimetz']).columns:
+                data_df[column] = data_df[column].dt.tz_localize(None)
+            data_df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return buffer.getvalue()
+
+
+def parquet_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def export_bytes(df, export_format, sheet_name="Data"):
+    """Serialize one DataFrame in one of EXPORT_FORMATS."""
+    if export_format == "CSV":
+        return csv_bytes(df)
+    if export_format == "CSV (gzip)":
+        return csv_bytes(df, compress=True)
+    if export_format == "Excel":
+        return excel_bytes({sheet_name: df})
+    if export_format == "Parquet":
+        return parquet_bytes(df)
+    raise ValueError(f"Unsupported export format: {export_format}")
@@ -0,0 +1,245 @@
+import csv
+import io
+import time
+from pathlib import Path
+
+import docx
+import openpyxl
+import pandas as pd
+import pptx
+import PyPDF2
+
+# Kept free of Streamlit so the functions can run in worker processes.
+
+DOCUMENT_EXTENSIONS = ['.pdf', '.docx', '.txt', '.pptx', '.csv', '.xls', '.xlsx']
+
+# PDF extraction stops at whichever cap is hit first. The text cap is well
+# past what retrieval can put in front of the model, so later pages of a
+# textbook-sized upload would never be used anyway.
+PDF_MAX_PAGES = 500
+PDF_MAX_TEXT_BYTES = 2 * 1024 * 1024
+PDF_MAX_SECONDS = 60
+# For offline ingestion, where nothing is waiting on the result
+PDF_NO_LIMITS = {"max_pages": None, "max_bytes": None, "max_seconds": None}
+
+TABLE_EXTENSIONS = ['.csv', '.xls', '.xlsx']
+# Tables up to this many rows are included in full; larger ones are
+# summarized as schema, column statistics and a head/tail sample
+TABLE_FULL_ROWS = 200
+TABLE_SAMPLE_ROWS = 5
+TABLE_TOP_VALUES = 3
+# Most rows returned by one row-range request
+TABLE_MAX_ROW_RANGE = 50
+
+
+# Extractors yield text segments and join once, so assembly stays linear in output size
+def iter_pdf_text(stream, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_TEXT_BYTES,
+                  max_seconds=PDF_MAX_SECONDS):
+    """Yield the text of each PDF page, stopping early at the page/byte/time caps.
+
+    Pages are parsed one at a time as they are requested, so stopping early
+    also skips the work for the remaining pages. When a cap is hit a final
+    note says where extraction stopped. A cap of None is not applied.
+    """
+    pdf_reader = PyPDF2.PdfReader(stream, strict=False)
+    total_pages = len(pdf_reader.pages)
+    deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+    used = 0
+    for page_number in range(total_pages):
+        if ((max_pages is not None and page_number >= max_pages)
+                or (max_bytes is not None and used >= max_bytes)
+                or (deadline is not None and time.monotonic() > deadline)):
+            yield f"\n[Extraction stopped after page {page_number} of {total_pages}]\n"
+            return
+        text = pdf_reader.pages[page_number].extract_text() or ""
+        used += len(text.encode("utf-8"))
+        yield text
+
+def extract_text_from_pdf(stream, **limits):
+    return "".join(iter_pdf_text(stream, **limits))
+
+def extract_text_from_docx(stream):
+    doc = docx.Document(stream)
+    return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+
+def iter_pptx_text(stream):
+    """Yield one line per text-bearing shape on every slide"""
+    prs = pptx.Presentation(stream)
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                yield shape.text + "\n"
+
+def extract_text_from_pptx(stream):
+    return "".join(iter_pptx_text(stream))
+
+def iter_csv_text(stream):
+    """Yield one comma-joined line per CSV row"""
+    with io.TextIOWrapper(stream, encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            yield ", ".join(row) + "\n"
+
+def _csv_rows(stream):
+    """Yield each CSV row as a list of strings, leaving stream open"""
+    f = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    try:
+        yield from csv.reader(f)
+    finally:
+        f.detach()
+
+def read_csv_frame(stream):
+    """Load a CSV into a DataFrame, tolerating files pandas misreads or rejects.
+
+    Rows are first scanned with csv.reader for their widths. When any row
+    is wider than the header, pandas would either raise or silently turn the
+    first column into the index, so such files are re-written with every row
+    padded to the widest one and handed back to pandas to infer dtypes.
+    """
+    header_width = None
+    width = 0
+    for row in _csv_rows(stream):
+        if header_width is None:
+            header_width = len(row)
+        width = max(width, len(row))
+    stream.seek(0)
+    if not width:
+        return pd.DataFrame()
+    if width == header_width:
+        try:
+            return pd.read_csv(stream, low_memory=False, index_col=False)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError):
+            stream.seek(0)
+    rows = _csv_rows(stream)
+    padded = io.StringIO()
+    writer = csv.writer(padded)
+    header = next(rows)
+    writer.writerow(header + [f"Unnamed: {i}" for i in range(len(header), width)])
+    writer.writerows(row + [""] * (width - len(row)) for row in rows)
+    padded.seek(0)
+    return pd.read_csv(padded, low_memory=False)
+
+def extract_text_from_csv(stream):
+    # Count rows with csv.reader so the common small file never goes through pandas
+    rows = sum(1 for _ in _csv_rows(stream)) - 1
+    stream.seek(0)
+    if rows <= TABLE_FULL_ROWS:
+        return "".join(iter_csv_text(stream))
+    return summarize_table(read_csv_frame(stream), "Table")
+
+def iter_excel_sheets(stream, file_extension='.xlsx'):
+    """Yield (sheet name, DataFrame) for every sheet, with column dtypes inferred.
+
+    .xlsx files are streamed row by row with openpyxl in read-only mode
+    instead of loading the whole workbook; legacy .xls goes through pandas.
+    """
+    if file_extension == '.xls':
+        excel_file = pd.ExcelFile(stream)
+        for sheet_name in excel_file.sheet_names:
+            yield sheet_name, pd.read_excel(excel_file, sheet_name=sheet_name)
+        return
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                yield sheet.title, pd.DataFrame()
+                continue
+            columns = [str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(header)]
+            df = pd.DataFrame(list(rows), columns=columns).dropna(how="all")
+            yield sheet.title, df.reset_index(drop=True).infer_objects()
+    finally:
+        workbook.close()
+
+def extract_text_from_excel(stream, file_extension='.xlsx'):
+    parts = []
+    for sheet_name, df in iter_excel_sheets(stream, file_extension):
+        if len(df) <= TABLE_FULL_ROWS:
+            parts.append(f"\nSheet: {sheet_name}\n" + df.to_string(index=False) + "\n")
+        else:
+            parts.append("\n" + summarize_table(df, f"Sheet: {sheet_name}"))
+    return "".join(parts)
+
+def _column_summary(series):
+    """One line describing a column's type, completeness and value range"""
+    line = f"- {series.name} ({series.dtype}, {series.count()} non-empty)"
+    values = series.dropna()
+    if values.empty:
+        return line
+    if pd.api.types.is_bool_dtype(series):
+        pass
+    elif pd.api.types.is_numeric_dtype(series):
+        return line + f": min {values.min():g}, max {values.max():g}, mean {values.mean():g}"
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        return line + f": from {values.min()} to {values.max()}"
+    top = values.astype(str).value_counts().head(TABLE_TOP_VALUES)
+    line += f": {values.nunique()} distinct"
+    if top.iloc[0] > 1:
+        line += ", most common " + ", ".join(f"{value} ({count})" for value, count in top.items())
+    return line
+
+def _numbered_rows(df, start):
+    """Render rows with 1-based row numbers matching what row-range requests use"""
+    numbered = df.copy()
+    numbered.index = range(start, start + len(df))
+    return numbered.to_string()
+
+def summarize_table(df, title):
+    """Compact text for a large table: schema, column statistics and a head/tail sample.
+
+    The size depends on the number of columns, not rows, so a large
+    gradebook costs a small fixed number of tokens.
+    """
+    lines = [f"{title} ({len(df)} rows x {len(df.columns)} columns, summarized)", "Columns:"]
+    lines.extend(_column_summary(df[column]) for column in df.columns)
+    lines.append(f"First {TABLE_SAMPLE_ROWS} rows:")
+    lines.append(_numbered_rows(df.head(TABLE_SAMPLE_ROWS), 1))
+    lines.append(f"Last {TABLE_SAMPLE_ROWS} rows:")
+    lines.append(_numbered_rows(df.tail(TABLE_SAMPLE_ROWS), len(df) - min(len(df), TABLE_SAMPLE_ROWS) + 1))
+    lines.append("Other rows can be requested by number, e.g. \"rows 100-120\".")
+    return "\n".join(lines) + "\n"
+
+def read_table_rows(file_name, data, start, stop):
+    """Text of rows start..stop (1-based, inclusive) from a CSV or Excel upload.
+
+    At most TABLE_MAX_ROW_RANGE rows are returned per sheet.
+    """
+    file_extension = Path(file_name).suffix.lower()
+    start = max(1, start)
+    stop = min(stop, start + TABLE_MAX_ROW_RANGE - 1)
+    if file_extension == '.csv':
+        sheets = [(None, read_csv_frame(io.BytesIO(data)))]
+    elif file_extension in ['.xls', '.xlsx']:
+        sheets = iter_excel_sheets(io.BytesIO(data), file_extension)
+    else:
+        raise ValueError(f"Not a table: {file_name}")
+    parts = []
+    for sheet_name, df in sheets:
+        rows = df.iloc[start - 1:stop]
+        if rows.empty:
+            continue
+        heading = f"Rows {start}-{start + len(rows) - 1}" + (f" of sheet {sheet_name}" if sheet_name else "")
+        parts.append(f"{heading}:\n{_numbered_rows(rows, start)}")
+    return "\n\n".join(parts)
+
+def extract_text(file_name, data, pdf_limits=None):
+    """Extract text from an uploaded file's bytes, dispatching on its extension.
+
+    Parses straight from memory; io.BytesIO shares the bytes instead of
+    copying them. pdf_limits overrides the PDF caps (see PDF_NO_LIMITS).
+    Raises ValueError for unsupported file types.
+    """
+    file_extension = Path(file_name).suffix.lower()
+    if file_extension == '.pdf':
+        return extract_text_from_pdf(io.BytesIO(data), **(pdf_limits or {}))
+    if file_extension == '.docx':
+        return extract_text_from_docx(io.BytesIO(data))
+    if file_extension == '.txt':
+        return bytes(data).decode('utf-8')
+    if file_extension == '.pptx':
+        return extract_text_from_pptx(io.BytesIO(data))
+    if file_extension == '.csv':
+        return extract_text_from_csv(io.BytesIO(data))
+    if file_extension in ['.xls', '.xlsx']:
+        return extract_text_from_excel(io.BytesIO(data), file_extension)
+    raise ValueError(f"Unsupported file type: {file_extension}")
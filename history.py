@@ -0,0 +1,68 @@
+import re
+
+from retrieval import estimate_tokens
+
+# Token budget for chat history sent with each request (system prompt and
+# document context are budgeted separately)
+HISTORY_TOKEN_BUDGET = 4000
+# Most recent messages sent verbatim (a turn is a student message plus a reply)
+RECENT_MESSAGES = 12
+# Token budget for the rolling summary of older messages
+SUMMARY_TOKEN_BUDGET = 600
+SUMMARY_LINE_CHARS = 240
+
+ROLE_LABELS = {"user": "Student", "assistant": "Tutor"}
+
+_SENTENCE_END = re.compile(r"(?<=[.?!])\s")
+
+
+def _summary_line(message):
+    """One compact line per message: its first sentence, trimmed."""
+    text = " ".join(message["content"].split())
+    first_sentence = _SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(first_sentence) > SUMMARY_LINE_CHARS:
+        first_sentence = first_sentence[:SUMMARY_LINE_CHARS].rstrip() + "..."
+    return f"{ROLE_LABELS.get(message['role'], message['role'])}: {first_sentence}"
+
+
+def fold_into_summary(summary, messages, max_tokens=SUMMARY_TOKEN_BUDGET):
+    """Append messages to the rolling summary, dropping the oldest lines past max_tokens."""
+    lines = summary.splitlines() if summary else []
+    lines.extend(_summary_line(message) for message in messages)
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def window_history(messages, summary="", summarized=0, token_budget=HISTORY_TOKEN_BUDGET,
+                   recent_messages=RECENT_MESSAGES):
+    """Fit chat history into token_budget.
+
+    Keeps the newest messages verbatim (up to recent_messages, always at least
+    the latest one) and folds everything older into a rolling summary.
+    summary/summarized are the state returned by the previous call, so each
+    message is summarized once. Returns (prompt messages, summary, summarized).
+    """
+    if summarized > len(messages):
+        # The conversation was reset (e.g. "New chat")
+        summary, summarized = "", 0
+
+    verbatim_budget = token_budget - SUMMARY_TOKEN_BUDGET
+    start = len(messages)
+    used = 0
+    while start > 0 and len(messages) - start < recent_messages:
+        cost = estimate_tokens(messages[start - 1]["content"])
+        if start < len(messages) and used + cost > verbatim_budget:
+            break
+        used += cost
+        start -= 1
+
+    if start > summarized:
+        summary = fold_into_summary(summary, messages[summarized:start])
+        summarized = start
+
+    prompt_messages = []
+    if summary:
+        prompt_messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    prompt_messages.extend({"role": m["role"], "content": m["content"]} for m in messages[start:])
+    return prompt_messages, summary, summarized
@@ -0,0 +1,54 @@
+import io
+
+from PIL import Image, ImageOps
+
+# Longest side sent to the vision model; larger phone photos are scaled down
+IMAGE_MAX_SIDE = 1568
+JPEG_QUALITY = 85
+# Longest side of the preview kept in session memory
+THUMBNAIL_SIDE = 320
+
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg']
+
+
+def prepare_image(data):
+    """Downscale and recompress an uploaded image for the vision model.
+
+    Applies the EXIF orientation, fits the image within IMAGE_MAX_SIDE and
+    re-encodes it as JPEG. The original bytes are kept when re-encoding would
+    not make them smaller. Returns (bytes, mime type).
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        original_format = image.format
+        image = ImageOps.exif_transpose(image)
+        resized = max(image.size) > IMAGE_MAX_SIDE
+        if resized:
+            image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+        if image.mode in ("RGBA", "LA", "P"):
+            # JPEG has no alpha channel; flatten onto white like a printed page
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    prepared = output.getvalue()
+    if not resized and len(prepared) >= len(data) and original_format in ("JPEG", "PNG"):
+        return data, f"image/{original_format.lower()}"
+    return prepared, "image/jpeg"
+
+
+def make_thumbnail(data):
+    """Small JPEG preview of an uploaded image, kept instead of the full upload"""
+    with Image.open(io.BytesIO(data)) as image:
+        # Lets JPEG decode at reduced resolution instead of full size
+        image.draft("RGB", (THUMBNAIL_SIDE, THUMBNAIL_SIDE))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((THUMBNAIL_SIDE, THUMBNAIL_SIDE))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=JPEG_QUALITY)
+    return output.getvalue()
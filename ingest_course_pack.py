@@ -0,0 +1,90 @@
+"""Pre-ingest a directory of course materials into a course pack.
+
+Usage:
+    python ingest_course_pack.py ACCT_2021_01 path/to/course/files
+
+Files are extracted, chunked and indexed in parallel worker processes, and
+the result is written to <data dir>/course_packs/<course_id>, where the
+chat app loads it the first time a student starts a chat for that course.
+"""
+import argparse
+import concurrent.futures
+import os
+import re
+import sys
+from pathlib import Path
+
+from course_pack import write_pack
+from disk_cache import content_hash
+from extractors import DOCUMENT_EXTENSIONS, PDF_NO_LIMITS, extract_text
+from retrieval import chunk_terms, chunk_text
+
+# Same location the app uses for its data
+DATA_DIR = Path("/data" if os.path.exists("/data") else ".")
+COURSE_PACKS_DIR = DATA_DIR / "course_packs"
+
+COURSE_ID_PATTERN = re.compile(r"^(ACCT|ECON|FIN|MIS|WMA)_\d{4}_\d{2}$")
+
+
+def ingest_file(path):
+    """Worker: extract, chunk and count terms for one file.
+
+    Unlike uploads, whole PDFs are extracted: the page, size and time caps
+    exist to keep a student waiting less, and nobody waits on ingestion.
+    """
+    data = Path(path).read_bytes()
+    text = extract_text(path, data, pdf_limits=PDF_NO_LIMITS)
+    chunks = chunk_text(text or "")
+    return Path(path).name, content_hash(data), chunks, [chunk_terms(chunk) for chunk in chunks]
+
+
+def find_files(directory):
+    return sorted(
+        path for path in Path(directory).rglob("*")
+        if path.is_file() and path.suffix.lower() in DOCUMENT_EXTENSIONS
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-ingest course materials for NuAnswers.")
+    parser.add_argument("course_id", help="Course ID, e.g. ACCT_2021_01")
+    parser.add_argument("directory", help="Directory of course PDFs, PPTX, DOCX, XLSX, CSV and TXT files")
+    parser.add_argument("--output", default=str(COURSE_PACKS_DIR), help="Course packs directory (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if not COURSE_ID_PATTERN.match(args.course_id):
+        parser.error("course_id must look like DEPT_####_## (ACCT, ECON, FIN, MIS or WMA)")
+    files = find_files(args.directory)
+    if not files:
+        parser.error(f"no supported files found in {args.directory}")
+
+    results = {}
+    skipped = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(ingest_file, str(path)): path for path in files}
+        for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+                print(f"[{done}/{len(files)}] {path.name}: {len(results[path][2])} passages")
+            except Exception as e:
+                skipped.append((path.name, str(e)))
+                print(f"[{done}/{len(files)}] {path.name}: skipped ({e})", file=sys.stderr)
+
+    # Drop duplicate files and keep a stable order regardless of completion order
+    documents = []
+    seen = set()
+    for path in files:
+        if path in results and results[path][1] not in seen:
+            seen.add(results[path][1])
+            documents.append(results[path])
+
+    manifest = write_pack(Path(args.output) / args.course_id, args.course_id, documents, skipped)
+    print(f"Wrote {manifest['passages']} passages from {len(documents)} documents "
+          f"to {Path(args.output) / args.course_id}")
+    return 0 if documents else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import concurrent.futures
+import concurrent.futures.process
+import math
+import multiprocessing
+import os
+import signal
+import threading
+
+from extractors import extract_text
+
+# Worker pools shared by every session in the process
+INGEST_PROCESSES = min(4, os.cpu_count() or 1)
+INGEST_THREADS = 4
+# Longest a single file may take to parse or analyze
+FILE_TIMEOUT_SECONDS = 120
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(kind):
+    with _pools_lock:
+        if kind not in _pools:
+            if kind == "process":
+                # spawn: forking a process that already runs server threads is unsafe
+                _pools[kind] = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=INGEST_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                _pools[kind] = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=INGEST_THREADS, thread_name_prefix="ingest")
+        return _pools[kind]
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("timed out")
+
+
+def _extract_with_timeout(file_name, data, timeout):
+    """Worker-process entry point: extract text, giving up after timeout seconds."""
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(timeout)
+    try:
+        return extract_text(file_name, data)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+def submit_document(file_name, data, timeout=FILE_TIMEOUT_SECONDS):
+    """Parse a document in the process pool (CPU-bound)."""
+    try:
+        return _get_pool("process").submit(_extract_with_timeout, file_name, data, timeout)
+    except concurrent.futures.process.BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool
+        with _pools_lock:
+            _pools.pop("process", None)
+        return _get_pool("process").submit(_extract_with_timeout, file_name, data, timeout)
+
+
+def submit_image(analyze, data):
+    """Run an image analysis call in the thread pool (network-bound)."""
+    return _get_pool("thread").submit(analyze, data)
+
+
+def gather(futures, timeout=FILE_TIMEOUT_SECONDS):
+    """Yield (key, result, error) for a {future: key} dict as each future finishes.
+
+    Files queued behind busy workers start late, so the overall wait allows
+    one timeout per wave of workers; anything still running after that is
+    reported as timed out.
+    """
+    waves = math.ceil(len(futures) / max(1, min(INGEST_PROCESSES, INGEST_THREADS)))
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=timeout * max(1, waves)):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    except concurrent.futures.TimeoutError:
+        for future, key in futures.items():
+            if not future.done():
+                future.cancel()
+                yield key, None, TimeoutError(f"timed out after {timeout} seconds")
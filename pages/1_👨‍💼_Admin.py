@@ -7,8 +7,12 @@ from datetime import datetime, timedelta
 import calendar
 import numpy as np
 from pathlib import Path
-import io
-from supabase_db import get_all_registrations, get_all_feedback, get_all_topics, get_all_completions
+from supabase_db import iter_registrations, iter_feedback, iter_topics, iter_completions, check_supabase_health
+from table_cache import IncrementalTable, CACHE_TTL_SECONDS
+from rollups import check_rollup, get_registration_rollup
+from lru_cache import LRUCache
+from exports import EXPORT_CACHE_SIZE, EXPORT_FORMATS, EXCEL_MIME, export_bytes, excel_bytes
+from response_cache import get_response_cache
 
 # Set page config
 st.set_page_config(
@@ -62,12 +66,65 @@ if entered_password != admin_password:
 
 st.sidebar.success("✅ Admin access granted!")
 
+# Warm up the shared Supabase connection (reconnects if the pooled session went stale).
+# A passing check is reused for HEALTH_CHECK_TTL_SECONDS, so most reruns skip the query
+if not check_supabase_health():
+    st.warning("Could not reach Supabase. Dashboard data may be missing or out of date.")
+
+# Process-wide table caches; each rerun only fetches rows newer than the cached watermark
+@st.cache_resource
+def get_table_caches():
+    return {
+        "registrations": IncrementalTable(iter_registrations),
+        "feedback": IncrementalTable(iter_feedback),
+        "topics": IncrementalTable(iter_topics),
+        "completions": IncrementalTable(iter_completions),
+    }
+
+# Built Plotly figures, reused until their input data changes; each is a few KB
+# to a few hundred KB of Plotly JSON
+FIGURE_CACHE_SIZE = 64
+
+@st.cache_resource
+def get_figure_cache():
+    return LRUCache(maxsize=FIGURE_CACHE_SIZE)
+
+def cached_figure(name, inputs, build):
+    """Return the figure for name, calling build() only when inputs (data versions, filters) change"""
+    return get_figure_cache().get_or_build((name, inputs), build)
+
+# Export files, built only when requested; the LRU bounds how many stay in memory
+@st.cache_resource
+def get_export_cache():
+    return LRUCache(maxsize=EXPORT_CACHE_SIZE)
+
+def cached_export(name, inputs, build):
+    """Return export bytes for name, calling build() only when inputs (data versions, filters) change"""
+    return get_export_cache().get_or_build((name, inputs), build)
+
+table_caches = get_table_caches()
+rollup = get_registration_rollup()
+force_refresh = st.sidebar.button("🔄 Refresh data")
+st.sidebar.caption(f"Data is reloaded in full every {CACHE_TTL_SECONDS // 60} minutes; new rows are fetched on every rerun.")
+
 try:
-    # Load all data from Supabase
-    df = get_all_registrations()
-    feedback_df = get_all_feedback()
-    topic_df = get_all_topics()
-    completion_df = get_all_completions()
+    # Load data from Supabase (incrementally after the first load)
+    df = table_caches["registrations"].refresh(force=force_refresh)
+    feedback_df = table_caches["feedback"].refresh(force=force_refresh)
+    topic_df = table_caches["topics"].refresh(force=force_refresh)
+    completion_df = table_caches["completions"].refresh(force=force_refresh)
+    rollup.sync(table_caches["registrations"])
+    versions = {name: (cache.generation, cache.version) for name, cache in table_caches.items()}
+    # Rollup figures follow the rollup, which also moves when the chat page saves a registration
+    versions["rollup"] = (rollup.generation, rollup.version)
+    totals = rollup.totals()
+    
+    if st.sidebar.button("Verify rollups"):
+        problems = check_rollup(rollup, df) if not df.empty else []
+        if problems:
+            st.sidebar.error("Rollups differ from raw data: " + "; ".join(problems))
+        else:
+            st.sidebar.success("Rollups match a full recompute.")
     
     # Convert timestamp columns to datetime if they exist
     for df_name, df_data in [('df', df), ('feedback_df', feedback_df), 
@@ -83,67 +140,80 @@ try:
     # Add download section at the top
     st.subheader("📥 Download Data")
     
-    download_col1, download_col2 = st.columns(2)
-    
     # Prepare all data
     all_data = {
-        "Registration Data": df,
-        "Feedback Data": feedback_df,
-        "Topic Data": topic_df,
-        "Completion Data": completion_df
+        "Registration Data": (df, "registrations"),
+        "Feedback Data": (feedback_df, "feedback"),
+        "Topic Data": (topic_df, "topics"),
+        "Completion Data": (completion_df, "completions")
     }
-    
-    # Create Excel file with multiple sheets
-    excel_buffer = io.BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-        for sheet_name, data_df in all_data.items():
-            if not data_df.empty:
-                data_df.to_excel(writer, sheet_name=sheet_name, index=False)
-            else:
-                # Create an empty DataFrame with the same columns
-                empty_df = pd.DataFrame(columns=data_df.columns)
-                empty_df.to_excel(writer, sheet_name=sheet_name, index=False)
-    
-    with download_col1:
-        # Download individual CSVs
-        for name, data_df in all_data.items():
-            if not data_df.empty:
-                csv_data = data_df.to_csv(index=False).encode('utf-8')
-            else:
-                # Create an empty CSV with headers
-                csv_data = pd.DataFrame(columns=data_df.columns).to_csv(index=False).encode('utf-8')
+    all_versions = tuple(sorted(versions.items()))
+    
+    # Exports are generated only after a click, then reused until the data changes
+    export_format = st.selectbox("Export format", list(EXPORT_FORMATS))
+    if st.button("Prepare downloads"):
+        st.session_state.export_request = (export_format, all_versions)
+    
+    if st.session_state.get("export_request") == (export_format, all_versions):
+        extension, mime = EXPORT_FORMATS[export_format]
+        download_col1, download_col2 = st.columns(2)
+        
+        with download_col1:
+            # Download individual tables
+            for name, (data_df, table) in all_data.items():
+                data = cached_export((name, export_format), versions[table],
+                                     lambda: export_bytes(data_df, export_format, sheet_name=name))
+                st.download_button(
+                    label=f"Download {name} ({export_format})",
+                    data=data,
+                    file_name=f"nuanswers_{name.lower().replace(' ', '_')}.{extension}",
+                    mime=mime
+                )
+        
+        with download_col2:
+            # Download combined Excel file
+            workbook = cached_export("All Data", all_versions,
+                                     lambda: excel_bytes({name: data_df for name, (data_df, _) in all_data.items()}))
             st.download_button(
-                label=f"Download {name} (CSV)",
-                data=csv_data,
-                file_name=f"nuanswers_{name.lower().replace(' ', '_')}.csv",
-                mime="text/csv"
+                label="Download All Data (Excel)",
+                data=workbook,
+                file_name="nuanswers_all_data.xlsx",
+                mime=EXCEL_MIME
             )
-    
-    with download_col2:
-        # Download combined Excel file
-        excel_buffer.seek(0)
-        st.download_button(
-            label="Download All Data (Excel)",
-            data=excel_buffer,
-            file_name="nuanswers_all_data.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
 
     # Overview metrics
     st.subheader("📊 Overview Metrics")
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Registrations", len(df) if not df.empty else 0)
+        st.metric("Total Registrations", totals["sessions"])
+    with col2:
+        st.metric("Total Usage Time (hrs)", f"{totals['usage_minutes'] / 60:.1f}")
+    with col3:
+        st.metric("Avg. Session Length (min)", f"{totals['avg_usage_minutes']:.1f}")
+    with col4:
+        st.metric("Unique Students", totals["unique_students"])
+    
+    # Opening-question response cache (process-wide, reset when the app restarts)
+    st.subheader("⚡ Response Cache")
+    response_cache = get_response_cache()
+    cache_stats = response_cache.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
     with col2:
-        total_usage = df['usage_time_minutes'].sum() if not df.empty else 0
-        st.metric("Total Usage Time (hrs)", f"{total_usage / 60:.1f}")
+        st.metric("Hits (exact / similar)", f"{cache_stats['exact_hits']} / {cache_stats['similar_hits']}")
     with col3:
-        avg_session = df['usage_time_minutes'].mean() if not df.empty else 0
-        st.metric("Avg. Session Length (min)", f"{avg_session:.1f}")
+        st.metric("Misses", cache_stats["misses"])
     with col4:
-        unique_students = df['student_id'].nunique() if not df.empty else 0
-        st.metric("Unique Students", unique_students)
+        st.metric("Cached Answers", cache_stats["entries"])
+    st.caption(
+        f"Similarity threshold {response_cache.threshold:.2f}, TTL {response_cache.ttl // 3600} hours, "
+        f"max {response_cache.max_entries} answers; {cache_stats['expired']} expired, {cache_stats['evictions']} evicted."
+    )
+    if st.button("Clear response cache"):
+        response_cache.clear()
+        st.rerun()
     
     # Return User Analysis
     st.subheader("🔄 Return User Analysis")
@@ -171,8 +241,9 @@ try:
             'Avg Minutes': [0] * len(dates)
         })
         
-        fig_daily = px.line(daily_stats, x='Date', y=['Registrations', 'Avg Minutes'],
-                           title='Daily Registration and Usage Trends')
+        fig_daily = cached_figure("daily", datetime.now().date(), lambda: px.line(
+            daily_stats, x='Date', y=['Registrations', 'Avg Minutes'],
+            title='Daily Registration and Usage Trends'))
         st.plotly_chart(fig_daily, use_container_width=True)
     
     with tab2:
@@ -184,26 +255,30 @@ try:
             'usage_time_minutes': [0] * 7
         }).set_index('day_of_week')
         
-        fig_weekly = go.Figure()
-        fig_weekly.add_trace(go.Bar(
-            x=weekly_stats.index,
-            y=weekly_stats['student_id'],
-            name='Number of Sessions'
-        ))
-        fig_weekly.add_trace(go.Scatter(
-            x=weekly_stats.index,
-            y=weekly_stats['usage_time_minutes'],
-            name='Avg Session Length (min)',
-            yaxis='y2'
-        ))
-        fig_weekly.update_layout(
-            title='Weekly Usage Patterns',
-            yaxis2=dict(
-                title='Avg Session Length (min)',
-                overlaying='y',
-                side='right'
+        def build_weekly():
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                x=weekly_stats.index,
+                y=weekly_stats['student_id'],
+                name='Number of Sessions'
+            ))
+            fig.add_trace(go.Scatter(
+                x=weekly_stats.index,
+                y=weekly_stats['usage_time_minutes'],
+                name='Avg Session Length (min)',
+                yaxis='y2'
+            ))
+            fig.update_layout(
+                title='Weekly Usage Patterns',
+                yaxis2=dict(
+                    title='Avg Session Length (min)',
+                    overlaying='y',
+                    side='right'
+                )
             )
-        )
+            return fig
+        
+        fig_weekly = cached_figure("weekly", None, build_weekly)
         st.plotly_chart(fig_weekly, use_container_width=True)
     
     with tab3:
@@ -213,8 +288,9 @@ try:
             'Count': [0] * 24
         })
         
-        fig_hourly = px.bar(hourly_dist, x='Hour', y='Count',
-                           title='Usage Distribution by Hour of Day')
+        fig_hourly = cached_figure("hourly", None, lambda: px.bar(
+            hourly_dist, x='Hour', y='Count',
+            title='Usage Distribution by Hour of Day'))
         st.plotly_chart(fig_hourly, use_container_width=True)
     
     # Time-Based Performance
@@ -229,9 +305,10 @@ try:
             'Avg Duration': [0] * 24
         })
         
-        fig_duration = px.line(hourly_duration, x='Hour', y='Avg Duration',
-                             title='Average Session Duration by Hour of Day',
-                             labels={'Hour': 'Hour of Day', 'Avg Duration': 'Average Duration (minutes)'})
+        fig_duration = cached_figure("duration", None, lambda: px.line(
+            hourly_duration, x='Hour', y='Avg Duration',
+            title='Average Session Duration by Hour of Day',
+            labels={'Hour': 'Hour of Day', 'Avg Duration': 'Average Duration (minutes)'}))
         st.plotly_chart(fig_duration, use_container_width=True)
         
         # Create empty duration distribution
@@ -240,30 +317,23 @@ try:
             'count': [0] * 30
         })
         
-        fig_duration_dist = px.histogram(duration_dist, x='usage_time_minutes',
-                                       title='Distribution of Session Durations',
-                                       labels={'usage_time_minutes': 'Session Duration (minutes)'},
-                                       nbins=30)
+        fig_duration_dist = cached_figure("duration_dist", None, lambda: px.histogram(
+            duration_dist, x='usage_time_minutes',
+            title='Distribution of Session Durations',
+            labels={'usage_time_minutes': 'Session Duration (minutes)'},
+            nbins=30))
         st.plotly_chart(fig_duration_dist, use_container_width=True)
     
     with tab2:
         if not df.empty:
-            # Peak usage times analysis
-            df['day_hour'] = df['timestamp'].dt.strftime('%A %H:00')
-            peak_usage = df.groupby('day_hour').size().reset_index(name='count')
-            peak_usage['day'] = peak_usage['day_hour'].str.split().str[0]
-            peak_usage['hour'] = peak_usage['day_hour'].str.split().str[1].str.split(':').str[0].astype(int)
-            
-            # Create a pivot table for the heatmap
-            peak_pivot = peak_usage.pivot(index='day', columns='hour', values='count')
-            # Use explicit day order instead of calendar.day_name
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            peak_pivot = peak_pivot.reindex(day_order)
+            # Peak usage times analysis (day x hour pivot from the rollup)
+            peak_pivot = rollup.peak_usage()
             
-            fig_heatmap = px.imshow(peak_pivot,
-                                   title='Peak Usage Times Heatmap',
-                                   labels=dict(x='Hour of Day', y='Day of Week', color='Number of Sessions'),
-                                   aspect='auto')
+            fig_heatmap = cached_figure("heatmap", versions["rollup"], lambda: px.imshow(
+                peak_pivot,
+                title='Peak Usage Times Heatmap',
+                labels=dict(x='Hour of Day', y='Day of Week', color='Number of Sessions'),
+                aspect='auto'))
             st.plotly_chart(fig_heatmap, use_container_width=True)
         else:
             st.info("No peak usage data available yet.")
@@ -279,10 +349,11 @@ try:
         user_frequency.columns = ['student_id', 'total_sessions', 'days_span']
         user_frequency['sessions_per_day'] = user_frequency['total_sessions'] / user_frequency['days_span'].clip(lower=1)
         
-        fig_frequency = px.histogram(user_frequency, x='sessions_per_day',
-                                    title='Distribution of Session Frequency',
-                                    labels={'sessions_per_day': 'Average Sessions per Day'},
-                                    nbins=20)
+        fig_frequency = cached_figure("frequency", versions["registrations"], lambda: px.histogram(
+            user_frequency, x='sessions_per_day',
+            title='Distribution of Session Frequency',
+            labels={'sessions_per_day': 'Average Sessions per Day'},
+            nbins=20))
         st.plotly_chart(fig_frequency, use_container_width=True)
         
         # Engagement metrics
@@ -301,17 +372,20 @@ try:
             st.metric("Avg Days Active", f"{avg_days_active:.1f}")
         
         # Time between sessions analysis
-        df_sorted = df.sort_values(['student_id', 'timestamp'])
-        df_sorted['prev_timestamp'] = df_sorted.groupby('student_id')['timestamp'].shift(1)
-        df_sorted['time_between_sessions'] = (df_sorted['timestamp'] - df_sorted['prev_timestamp']).dt.total_seconds() / 3600  # in hours
-        
-        # Filter out first sessions (no previous timestamp) and unreasonable values
-        time_between = df_sorted[df_sorted['time_between_sessions'].between(0, 720)]  # up to 30 days
+        def build_time_between():
+            df_sorted = df.sort_values(['student_id', 'timestamp'])
+            df_sorted['prev_timestamp'] = df_sorted.groupby('student_id')['timestamp'].shift(1)
+            df_sorted['time_between_sessions'] = (df_sorted['timestamp'] - df_sorted['prev_timestamp']).dt.total_seconds() / 3600  # in hours
+            
+            # Filter out first sessions (no previous timestamp) and unreasonable values
+            time_between = df_sorted[df_sorted['time_between_sessions'].between(0, 720)]  # up to 30 days
+            
+            return px.histogram(time_between, x='time_between_sessions',
+                                title='Time Between Sessions',
+                                labels={'time_between_sessions': 'Hours Between Sessions'},
+                                nbins=50)
         
-        fig_time_between = px.histogram(time_between, x='time_between_sessions',
-                                       title='Time Between Sessions',
-                                       labels={'time_between_sessions': 'Hours Between Sessions'},
-                                       nbins=50)
+        fig_time_between = cached_figure("time_between", versions["registrations"], build_time_between)
         st.plotly_chart(fig_time_between, use_container_width=True)
     else:
         st.info("No user engagement data available yet.")
@@ -322,21 +396,22 @@ try:
     if not df.empty:
         # Grade level progression
         grade_order = ['Freshman', 'Sophomore', 'Junior', 'Senior', 'Graduate']
-        grade_usage = df.groupby(['grade', 'major']).agg({
-            'student_id': 'count',
-            'usage_time_minutes': 'mean'
-        }).reset_index()
+        grade_usage = rollup.usage_by(['grade', 'major']).rename(columns={
+            'Session Count': 'student_id',
+            'Avg Minutes': 'usage_time_minutes'
+        })
         
-        fig_grade_usage = px.scatter(grade_usage, 
-                                    x='grade', 
-                                    y='usage_time_minutes',
-                                    size='student_id',
-                                    color='major',
-                                    category_orders={'grade': grade_order},
-                                    title='Usage Patterns by Grade Level and Major',
-                                    labels={'grade': 'Grade Level', 
-                                           'usage_time_minutes': 'Average Session Duration (min)',
-                                           'student_id': 'Number of Sessions'})
+        fig_grade_usage = cached_figure("grade_usage", versions["rollup"], lambda: px.scatter(
+            grade_usage,
+            x='grade',
+            y='usage_time_minutes',
+            size='student_id',
+            color='major',
+            category_orders={'grade': grade_order},
+            title='Usage Patterns by Grade Level and Major',
+            labels={'grade': 'Grade Level',
+                    'usage_time_minutes': 'Average Session Duration (min)',
+                    'student_id': 'Number of Sessions'}))
         st.plotly_chart(fig_grade_usage, use_container_width=True)
     else:
         st.info("No academic performance data available yet.")
@@ -355,10 +430,11 @@ try:
             st.metric("Average Session Rating", f"{avg_rating:.1f}/5")
             
             # Rating distribution
-            fig_ratings = px.histogram(feedback_df, x='rating',
-                                     title='Distribution of Session Ratings',
-                                     labels={'rating': 'Rating (1-5)'},
-                                     nbins=5)
+            fig_ratings = cached_figure("ratings", versions["feedback"], lambda: px.histogram(
+                feedback_df, x='rating',
+                title='Distribution of Session Ratings',
+                labels={'rating': 'Rating (1-5)'},
+                nbins=5))
             st.plotly_chart(fig_ratings, use_container_width=True)
         else:
             st.info("No feedback data available yet")
@@ -372,10 +448,11 @@ try:
             
             # Completion by course
             course_completion = completion_df.groupby('course_id')['completed'].mean() * 100
-            fig_completion = px.bar(x=course_completion.index, 
-                                  y=course_completion.values,
-                                  title='Completion Rates by Course',
-                                  labels={'x': 'Course ID', 'y': 'Completion Rate (%)'})
+            fig_completion = cached_figure("completion", versions["completions"], lambda: px.bar(
+                x=course_completion.index,
+                y=course_completion.values,
+                title='Completion Rates by Course',
+                labels={'x': 'Course ID', 'y': 'Completion Rate (%)'}))
             st.plotly_chart(fig_completion, use_container_width=True)
         else:
             st.info("No completion data available yet")
@@ -390,27 +467,32 @@ try:
         with topic_col1:
             # Most common topics
             topic_counts = topic_df['topic'].value_counts().head(10)
-            fig_topics = px.bar(x=topic_counts.index, 
-                              y=topic_counts.values,
-                              title='Top 10 Most Common Topics',
-                              labels={'x': 'Topic', 'y': 'Number of Questions'})
+            fig_topics = cached_figure("topics", versions["topics"], lambda: px.bar(
+                x=topic_counts.index,
+                y=topic_counts.values,
+                title='Top 10 Most Common Topics',
+                labels={'x': 'Topic', 'y': 'Number of Questions'}))
             st.plotly_chart(fig_topics, use_container_width=True)
         
         with topic_col2:
             # Topic difficulty analysis
             if 'difficulty' in topic_df.columns:
                 topic_difficulty = topic_df.groupby('topic')['difficulty'].mean().sort_values(ascending=False).head(10)
-                fig_difficulty = px.bar(x=topic_difficulty.index,
-                                      y=topic_difficulty.values,
-                                      title='Most Challenging Topics',
-                                      labels={'x': 'Topic', 'y': 'Average Difficulty (1-5)'})
+                fig_difficulty = cached_figure("difficulty", versions["topics"], lambda: px.bar(
+                    x=topic_difficulty.index,
+                    y=topic_difficulty.values,
+                    title='Most Challenging Topics',
+                    labels={'x': 'Topic', 'y': 'Average Difficulty (1-5)'}))
                 st.plotly_chart(fig_difficulty, use_container_width=True)
         
         # Topic trends over time
-        topic_trends = topic_df.groupby([pd.Grouper(key='timestamp', freq='D'), 'topic']).size().unstack(fill_value=0)
-        fig_trends = px.line(topic_trends,
+        def build_trends():
+            topic_trends = topic_df.groupby([pd.Grouper(key='timestamp', freq='D'), 'topic']).size().unstack(fill_value=0)
+            return px.line(topic_trends,
                            title='Topic Trends Over Time',
                            labels={'value': 'Number of Questions', 'variable': 'Topic'})
+        
+        fig_trends = cached_figure("trends", versions["topics"], build_trends)
         st.plotly_chart(fig_trends, use_container_width=True)
     else:
         st.info("No topic data available yet")
@@ -423,22 +505,25 @@ try:
         
         with col1:
             # Campus distribution
-            campus_dist = df['campus'].value_counts()
-            fig_campus = px.pie(values=campus_dist.values, names=campus_dist.index,
-                               title='Distribution by Campus')
+            campus_dist = rollup.distribution('campus')
+            fig_campus = cached_figure("campus", versions["rollup"], lambda: px.pie(
+                values=campus_dist.values, names=campus_dist.index,
+                title='Distribution by Campus'))
             st.plotly_chart(fig_campus)
             
         with col2:
             # Major distribution
-            major_dist = df['major'].value_counts()
-            fig_major = px.pie(values=major_dist.values, names=major_dist.index,
-                              title='Distribution by Major')
+            major_dist = rollup.distribution('major')
+            fig_major = cached_figure("major", versions["rollup"], lambda: px.pie(
+                values=major_dist.values, names=major_dist.index,
+                title='Distribution by Major'))
             st.plotly_chart(fig_major)
         
         # Grade Level Analysis
-        grade_dist = df['grade'].value_counts()
-        fig_grade = px.bar(x=grade_dist.index, y=grade_dist.values,
-                           title='Distribution by Grade Level')
+        grade_dist = rollup.distribution('grade')
+        fig_grade = cached_figure("grade", versions["rollup"], lambda: px.bar(
+            x=grade_dist.index, y=grade_dist.values,
+            title='Distribution by Grade Level'))
         st.plotly_chart(fig_grade, use_container_width=True)
     else:
         st.info("No demographic data available yet")
@@ -448,38 +533,40 @@ try:
     
     if not df.empty:
         # Major vs Grade Level
-        major_grade_dist = pd.crosstab(df['major'], df['grade'])
-        fig_major_grade = px.imshow(major_grade_dist,
-                                   title='Major vs Grade Level Distribution',
-                                   aspect='auto')
+        major_grade_dist = rollup.crosstab('major', 'grade')
+        fig_major_grade = cached_figure("major_grade", versions["rollup"], lambda: px.imshow(
+            major_grade_dist,
+            title='Major vs Grade Level Distribution',
+            aspect='auto'))
         st.plotly_chart(fig_major_grade, use_container_width=True)
         
         # Usage Patterns by Major
-        major_usage = df.groupby('major').agg({
-            'usage_time_minutes': ['mean', 'count']
-        }).reset_index()
-        major_usage.columns = ['Major', 'Avg Minutes', 'Session Count']
-        
-        fig_major_usage = go.Figure()
-        fig_major_usage.add_trace(go.Bar(
-            x=major_usage['Major'],
-            y=major_usage['Session Count'],
-            name='Number of Sessions'
-        ))
-        fig_major_usage.add_trace(go.Scatter(
-            x=major_usage['Major'],
-            y=major_usage['Avg Minutes'],
-            name='Avg Session Length (min)',
-            yaxis='y2'
-        ))
-        fig_major_usage.update_layout(
-            title='Usage Patterns by Major',
-            yaxis2=dict(
-                title='Avg Session Length (min)',
-                overlaying='y',
-                side='right'
+        major_usage = rollup.usage_by('major').rename(columns={'major': 'Major'})
+        
+        def build_major_usage():
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                x=major_usage['Major'],
+                y=major_usage['Session Count'],
+                name='Number of Sessions'
+            ))
+            fig.add_trace(go.Scatter(
+                x=major_usage['Major'],
+                y=major_usage['Avg Minutes'],
+                name='Avg Session Length (min)',
+                yaxis='y2'
+            ))
+            fig.update_layout(
+                title='Usage Patterns by Major',
+                yaxis2=dict(
+                    title='Avg Session Length (min)',
+                    overlaying='y',
+                    side='right'
+                )
             )
-        )
+            return fig
+        
+        fig_major_usage = cached_figure("major_usage", versions["rollup"], build_major_usage)
         st.plotly_chart(fig_major_usage, use_container_width=True)
     else:
         st.info("No cross analysis data available yet")
@@ -493,21 +580,24 @@ try:
         with tab1:
             col1, col2 = st.columns(2)
             with col1:
-                course_dist = df['course_name'].value_counts().head(10)
-                fig_course = px.bar(x=course_dist.index, y=course_dist.values,
-                                   title='Top 10 Most Common Courses')
+                course_dist = rollup.distribution('course_name').head(10)
+                fig_course = cached_figure("course", versions["rollup"], lambda: px.bar(
+                    x=course_dist.index, y=course_dist.values,
+                    title='Top 10 Most Common Courses'))
                 st.plotly_chart(fig_course, use_container_width=True)
             
             with col2:
-                course_id_dist = df['course_id'].value_counts().head(10)
-                fig_course_id = px.bar(x=course_id_dist.index, y=course_id_dist.values,
-                                      title='Top 10 Course IDs')
+                course_id_dist = rollup.distribution('course_id').head(10)
+                fig_course_id = cached_figure("course_id", versions["rollup"], lambda: px.bar(
+                    x=course_id_dist.index, y=course_id_dist.values,
+                    title='Top 10 Course IDs'))
                 st.plotly_chart(fig_course_id, use_container_width=True)
         
         with tab2:
-            prof_dist = df['professor'].value_counts()
-            fig_prof = px.pie(values=prof_dist.values, names=prof_dist.index,
-                             title='Distribution by Professor')
+            prof_dist = rollup.distribution('professor')
+            fig_prof = cached_figure("prof", versions["rollup"], lambda: px.pie(
+                values=prof_dist.values, names=prof_dist.index,
+                title='Distribution by Professor'))
             st.plotly_chart(fig_prof, use_container_width=True)
     else:
         st.info("No course analysis data available yet")
@@ -577,28 +667,22 @@ try:
             use_container_width=True
         )
         
-        # Download options
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            csv = filtered_df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Download as CSV",
-                data=csv,
-                file_name="nuanswers_registration_data.csv",
-                mime="text/csv"
-            )
-            
-        with col2:
-            excel_buffer = pd.ExcelWriter(pd.io.common.BytesIO(), engine='openpyxl')
-            filtered_df.to_excel(excel_buffer, index=False)
-            excel_data = pd.io.common.BytesIO()
-            filtered_df.to_excel(excel_data, index=False)
+        # Download options (generated on request, cached per data version and filters)
+        filter_key = (versions["registrations"], tuple(date_range), tuple(selected_majors),
+                      tuple(selected_campuses), tuple(selected_professors))
+        filtered_format = st.selectbox("Filtered export format", list(EXPORT_FORMATS), key="filtered_export_format")
+        if st.button("Prepare filtered download"):
+            st.session_state.filtered_export_request = (filtered_format, filter_key)
+        
+        if st.session_state.get("filtered_export_request") == (filtered_format, filter_key):
+            extension, mime = EXPORT_FORMATS[filtered_format]
+            data = cached_export(("Filtered Registrations", filtered_format), filter_key,
+                                 lambda: export_bytes(filtered_df, filtered_format, sheet_name="Registration Data"))
             st.download_button(
-                label="📊 Download as Excel",
-                data=excel_data.getvalue(),
-                file_name="nuanswers_registration_data.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                label=f"📥 Download filtered data ({filtered_format})",
+                data=data,
+                file_name=f"nuanswers_registration_data.{extension}",
+                mime=mime
             )
     else:
         st.info("No registration data available yet")
@@ -0,0 +1,140 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from retrieval import STOPWORDS, tokenize
+
+# Cached opening answers live this long and at most this many are kept (LRU)
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+RESPONSE_CACHE_MAX_ENTRIES = 500
+# Share of content words two prompts must have in common (Jaccard) to match
+SIMILARITY_THRESHOLD = 0.8
+
+# Words that only change how an opening question is phrased, not what it asks
+QUESTION_WORDS = frozenset("""
+what's whats how's hows me please explain tell help understand know need want
+about find get im i'm is are
+""".split())
+
+_POSSESSIVE = re.compile(r"'s$")
+
+
+def prompt_terms(prompt):
+    """Normalized content words of a prompt, used for matching"""
+    terms = set()
+    for token in tokenize(prompt):
+        if token in STOPWORDS or token in QUESTION_WORDS:
+            continue
+        terms.add(_POSSESSIVE.sub("", token))
+    return frozenset(terms)
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ResponseCache:
+    """Process-wide cache of tutor answers to opening questions.
+
+    Entries are scoped by course_id and system prompt version. A lookup first
+    tries the exact normalized prompt, then the most similar cached prompt
+    in the same scope, scored by the Jaccard overlap of content words.
+    Entries expire after ttl seconds, and the least recently used are evicted
+    past max_entries. Counters are kept so admins can tune the threshold.
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL_SECONDS, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 threshold=SIMILARITY_THRESHOLD):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, course_id, prompt_version, prompt):
+        """Return a cached response for prompt, or None"""
+        terms = prompt_terms(prompt)
+        if not terms:
+            return None
+        now = time.time()
+        with self._lock:
+            key = (course_id, prompt_version, terms)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[0]
+
+            best_key, best_score = None, self.threshold
+            for other_key, (_, created) in list(self._entries.items()):
+                if other_key[0] != course_id or other_key[1] != prompt_version:
+                    continue
+                if now - created > self.ttl:
+                    del self._entries[other_key]
+                    self.expired += 1
+                    continue
+                score = similarity(terms, other_key[2])
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.similar_hits += 1
+            return self._entries[best_key][0]
+
+    def put(self, course_id, prompt_version, prompt, response):
+        terms = prompt_terms(prompt)
+        if not terms or not response:
+            return
+        with self._lock:
+            key = (course_id, prompt_version, terms)
+            self._entries[key] = (response, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "lookups": lookups,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Shared cache for the process, so the Admin page sees the chat page's metrics."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,350 @@
+import bisect
+import math
+import re
+import sys
+from array import array
+from collections import Counter
+
+# Passage size and overlap, in words
+CHUNK_WORDS = 200
+CHUNK_OVERLAP_WORDS = 40
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i if in into is it its of on or
+so that the their then there these this to was we what when where which who why
+will with you your do does did can could should would
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens (numbers and decimals kept, e.g. 1.5)."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def estimate_tokens(text):
+    """Rough model token count (about 4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap_words=CHUNK_OVERLAP_WORDS):
+    """Split text into overlapping passages of roughly chunk_words words."""
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, chunk_words - overlap_words)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+def chunk_terms(chunk):
+    """Term frequencies of a passage as indexed for retrieval (stopwords removed)."""
+    return Counter(token for token in tokenize(chunk) if token not in STOPWORDS)
+
+
+def join_chunks(chunks, overlap_words=CHUNK_OVERLAP_WORDS):
+    """Rebuild the text split by chunk_text (whitespace collapsed to single spaces)."""
+    if not chunks:
+        return ""
+    words = chunks[0].split()
+    for chunk in chunks[1:]:
+        words.extend(chunk.split()[overlap_words:])
+    return " ".join(words)
+
+
+def _pack(grouped, columns):
+    """Lay out {term: [row, ...]} as a sorted vocabulary, term offsets and one flat array per row field.
+
+    A term's rows are column[offsets[slot]:offsets[slot + 1]], where slot is
+    its position in the vocabulary. Flat arrays avoid a list object per term,
+    which would otherwise cost several times the size of the text.
+    """
+    vocabulary = tuple(sorted(grouped))
+    offsets = array("I", [0])
+    arrays = [array("I") for _ in range(columns)]
+    for term in vocabulary:
+        for row in grouped[term]:
+            for column, value in zip(arrays, row):
+                column.append(value)
+        offsets.append(len(arrays[0]))
+    return vocabulary, offsets, arrays
+
+
+def _nbytes(vocabulary, *arrays):
+    """Memory of a packed vocabulary and its arrays"""
+    return (sys.getsizeof(vocabulary) + sum(sys.getsizeof(term) for term in vocabulary)
+            + sum(sys.getsizeof(values) for values in arrays))
+
+
+def _slot(vocabulary, term):
+    """Position of term in the sorted vocabulary, or None"""
+    slot = bisect.bisect_left(vocabulary, term)
+    if slot < len(vocabulary) and vocabulary[slot] == term:
+        return slot
+    return None
+
+
+class DocumentPassages:
+    """BM25 postings for one document's passages, built once and never modified.
+
+    Postings give, per term, the passages (numbered within the document)
+    containing it and its frequency in each. Because it is immutable, one
+    instance can back the passage indexes of every session that has the
+    document.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = tuple(chunks)
+        self.lengths = array("I")
+        grouped = {}
+        for number, chunk in enumerate(self.chunks):
+            counts = chunk_terms(chunk)
+            self.lengths.append(sum(counts.values()))
+            for term, freq in counts.items():
+                grouped.setdefault(term, []).append((number, freq))
+        self._vocabulary, self._offsets, (self._numbers, self._freqs) = _pack(grouped, 2)
+        self.total_length = sum(self.lengths)
+        self.nbytes = _nbytes(self._vocabulary, self._offsets, self._numbers, self._freqs, self.lengths)
+
+    def postings(self, term):
+        """[(passage number, frequency)] for term"""
+        slot = _slot(self._vocabulary, term)
+        if slot is None:
+            return []
+        start, end = self._offsets[slot], self._offsets[slot + 1]
+        return list(zip(self._numbers[start:end], self._freqs[start:end]))
+
+
+class PassageIndex:
+    """BM25 index over the passages of a session's documents.
+
+    It only references each document's DocumentPassages, so building it
+    costs a list of pointers. Passage ids run through the documents in order.
+    passages[i] gives (document name, passage text).
+    """
+
+    def __init__(self):
+        self._names = []
+        self._documents = []
+        self._offsets = []
+        self._total = 0
+        self._total_length = 0
+        self.passages = _IndexPassages(self)
+
+    def add_document(self, name, chunks=None, passages=None):
+        """Add a document by its chunks, or by a prebuilt (possibly shared) DocumentPassages."""
+        if passages is None:
+            passages = DocumentPassages(chunks)
+        self._names.append(name)
+        self._documents.append(passages)
+        self._offsets.append(self._total)
+        self._total += len(passages.chunks)
+        self._total_length += passages.total_length
+
+    def document_starts(self):
+        """[(first passage id, passage count)] for each document"""
+        return [(offset, len(doc.chunks)) for offset, doc in zip(self._offsets, self._documents)]
+
+    def _postings(self, term):
+        postings = []
+        for offset, doc in zip(self._offsets, self._documents):
+            lengths = doc.lengths
+            postings.extend((offset + number, freq, lengths[number]) for number, freq in doc.postings(term))
+        return postings
+
+    def search(self, query, top_k=None):
+        """Return [(score, passage id)] for passages matching query, best first."""
+        return bm25_rank(query, self._total, self._total_length, self._postings, top_k)
+
+
+class _IndexPassages:
+    """Sequence of (document name, passage text) over a PassageIndex's documents"""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index._total
+
+    def __getitem__(self, passage_id):
+        index = self._index
+        if not 0 <= passage_id < index._total:
+            raise IndexError(passage_id)
+        position = bisect.bisect_right(index._offsets, passage_id) - 1
+        return index._names[position], index._documents[position].chunks[passage_id - index._offsets[position]]
+
+
+def bm25_rank(query, total, total_length, postings_for, top_k=None):
+    """Score passages for query with BM25.
+
+    total and total_length are the passage count and summed indexed term
+    counts; postings_for(term) returns [(passage id, frequency, passage
+    length)] or None. Returns [(score, passage id)], best first.
+    """
+    if not total:
+        return []
+    avg_length = total_length / total or 1.0
+    scores = Counter()
+    for term in set(tokenize(query)) - STOPWORDS:
+        postings = postings_for(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+        for passage_id, freq, length in postings:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+            scores[passage_id] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+    ranked = sorted(((score, passage_id) for passage_id, score in scores.items()), reverse=True)
+    return ranked[:top_k] if top_k else ranked
+
+
+def _leading_passages(index):
+    """Passage ids ordered first passage of every document, then second, and so on.
+
+    Works from the index's document_starts(), so no passage text is read.
+    """
+    order = []
+    for first, count in index.document_starts():
+        order.extend((position, first + position) for position in range(count))
+    return [(0.0, passage_id) for _, passage_id in sorted(order)]
+
+
+def select_context(index, query, token_budget, top_k=None):
+    """Pick the highest-scoring passages for query that fit in token_budget.
+
+    index may be a list of indexes (e.g. the session's uploads and the
+    course pack), whose results are merged by score. When nothing matches
+    the query (e.g. "can you help with this?") the opening passages of each
+    document in the first index are used instead. Returns a list of
+    (document name, passage text) in ranking order.
+    """
+    indexes = index if isinstance(index, (list, tuple)) else [index]
+    ranked = []
+    for position, each in enumerate(indexes):
+        ranked.extend((score, position, passage_id) for score, passage_id in each.search(query, top_k))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    if top_k:
+        ranked = ranked[:top_k]
+    if not ranked and indexes:
+        ranked = [(score, 0, passage_id) for score, passage_id in _leading_passages(indexes[0])]
+    selected = []
+    used = 0
+    for _, position, passage_id in ranked:
+        name, passage = indexes[position].passages[passage_id]
+        cost = estimate_tokens(passage)
+        if used + cost > token_budget:
+            if used:
+                break
+            continue
+        selected.append((name, passage))
+        used += cost
+    return selected
+
+
+class DocumentTokens:
+    """Positional token index of one document's text, built once and never modified.
+
+    Keeps the character offsets of every token and, per term, the positions
+    where it occurs, in vocabulary order so a prefix matches a contiguous run
+    of terms. Like DocumentPassages it can be shared by every session holding
+    the document.
+    """
+
+    def __init__(self, text):
+        self.starts = array("I")
+        self.ends = array("I")
+        grouped = {}
+        for position, match in enumerate(TOKEN_PATTERN.finditer(text.lower())):
+            self.starts.append(match.start())
+            self.ends.append(match.end())
+            grouped.setdefault(match.group(), []).append((position,))
+        self._vocabulary, self._offsets, (self._positions,) = _pack(grouped, 1)
+        self.nbytes = _nbytes(self._vocabulary, self._offsets, self._positions, self.starts, self.ends)
+
+    def positions(self, token, prefix=False):
+        """Token positions of token, or of every term starting with it when prefix is set"""
+        if prefix:
+            first = bisect.bisect_left(self._vocabulary, token)
+            last = bisect.bisect_left(self._vocabulary, token + "\uffff")
+        else:
+            first = _slot(self._vocabulary, token)
+            if first is None:
+                return []
+            last = first + 1
+        positions = []
+        for slot in range(first, last):
+            positions.extend(self._positions[self._offsets[slot]:self._offsets[slot + 1]])
+        return positions
+
+
+class DocumentSearchIndex:
+    """Positional search over whole uploaded documents for the search box.
+
+    Each document's DocumentTokens is built once when it is uploaded (and
+    shared when the document is), so a query is answered with ranking and
+    highlight offsets without rescanning document text. The last query term
+    matches as a prefix, so results update while a word is being typed.
+    """
+
+    def __init__(self):
+        self._documents = {}
+
+    def __contains__(self, key):
+        return key in self._documents
+
+    def keys(self):
+        return list(self._documents)
+
+    def add_document(self, key, text=None, tokens=None):
+        """Add a document by its text, or by a prebuilt (possibly shared) DocumentTokens."""
+        self._documents[key] = tokens if tokens is not None else DocumentTokens(text)
+
+    def remove_document(self, key):
+        self._documents.pop(key, None)
+
+    def search(self, query, max_highlights=50):
+        """Rank documents containing every query term.
+
+        Returns [(score, key, highlights)] best first, where highlights are
+        sorted (start, end) character offsets of matching tokens. Documents
+        where the terms also appear as a consecutive phrase rank higher.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # {key: [positions of each query token]} for documents containing every token
+        candidates = {}
+        for key, doc in self._documents.items():
+            matches = []
+            for i, token in enumerate(tokens):
+                positions = doc.positions(token, prefix=(i == len(tokens) - 1))
+                if not positions:
+                    break
+                matches.append(positions)
+            else:
+                candidates[key] = matches
+
+        total = len(self._documents)
+        results = []
+        for key, matches in candidates.items():
+            idf = math.log(1 + total / len(candidates))
+            score = sum(idf * (1 + math.log(len(positions))) for positions in matches)
+            if len(matches) > 1:
+                following = set(matches[0])
+                for positions in matches[1:]:
+                    following = {p + 1 for p in following} & set(positions)
+                if following:
+                    score *= 2
+            doc = self._documents[key]
+            highlight_positions = sorted(p for positions in matches for p in positions)[:max_highlights]
+            results.append((score, key, [(doc.starts[p], doc.ends[p]) for p in highlight_positions]))
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results
@@ -0,0 +1,254 @@
+import hashlib
+import math
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Columns with their own per-value rollup (session counts and usage)
+ROLLUP_DIMENSIONS = ["campus", "major", "grade", "course_name", "course_id", "professor"]
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+# HyperLogLog registers used to count unique students (2**14 bytes, about 0.8% error)
+UNIQUE_PRECISION = 14
+
+
+class UniqueCounter:
+    """HyperLogLog estimate of the number of distinct values, in fixed memory.
+
+    Small counts fall back to linear counting, which is close to exact, so
+    the estimate only drifts (by about 0.8%) once there are tens of
+    thousands of distinct values.
+    """
+
+    def __init__(self, precision=UNIQUE_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        bits = 64 - self.precision
+        for value in values:
+            digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+            h = int.from_bytes(digest, "big")
+            slot = h >> bits
+            rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+            if rank > self.registers[slot]:
+                self.registers[slot] = rank
+
+    def __len__(self):
+        m = len(self.registers)
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if zeros == m:
+            return 0
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / float(np.sum(np.exp2(-self.registers.astype(float))))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+def _add_measures(store, grouped):
+    """Add grouped [sessions, usage_minutes, usage_count] sums into store {key: list}"""
+    for key, (sessions, minutes, count) in zip(grouped.index, grouped.itertuples(index=False)):
+        measures = store.get(key)
+        if measures is None:
+            store[key] = [int(sessions), float(minutes), int(count)]
+        else:
+            measures[0] += int(sessions)
+            measures[1] += float(minutes)
+            measures[2] += int(count)
+
+
+def _timestamps(rows):
+    """Rows' timestamps as timezone-naive UTC, matching iter_registrations"""
+    timestamps = pd.to_datetime(rows['timestamp'], utc=True)
+    return timestamps.dt.tz_localize(None)
+
+
+class RegistrationRollup:
+    """Registration aggregates, each kept at the granularity its chart needs.
+
+    - sessions per (date, hour) for the weekday x hour heatmap
+    - sessions and usage per value of each ROLLUP_DIMENSIONS column
+    - sessions and usage per (major, grade) for the crosstab and scatter
+    - overall totals, and unique students as a fixed-size HyperLogLog
+
+    None of these grow with the number of registrations. Rows are folded in
+    as they are saved (record) and as the admin table fetches deltas (sync);
+    rows already recorded are skipped by id when their delta arrives.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generation = None
+        self._reset()
+
+    def _reset(self):
+        self.sessions = 0
+        self.usage_minutes = 0.0
+        self.usage_count = 0
+        self.by_hour = Counter()
+        self.by_dimension = {column: {} for column in ROLLUP_DIMENSIONS}
+        self.by_major_grade = {}
+        self.students = UniqueCounter()
+        self.rows_seen = 0
+        self._recorded = set()
+        self.version = 0
+
+    def _fold(self, rows):
+        if 'timestamp' not in rows.columns:
+            return
+        rows = rows[rows['timestamp'].notna()]
+        if rows.empty:
+            return
+        usage = pd.to_numeric(rows['usage_time_minutes'], errors='coerce') if 'usage_time_minutes' in rows.columns else pd.Series(np.nan, index=rows.index)
+        measures = pd.DataFrame({
+            "sessions": 1,
+            "usage_minutes": usage.fillna(0.0),
+            "usage_count": usage.notna().astype(int),
+        }, index=rows.index)
+        self.sessions += len(rows)
+        self.usage_minutes += float(measures['usage_minutes'].sum())
+        self.usage_count += int(measures['usage_count'].sum())
+
+        timestamps = rows['timestamp']
+        for key, count in measures['sessions'].groupby([timestamps.dt.date, timestamps.dt.hour]).sum().items():
+            self.by_hour[key] += int(count)
+        for column in ROLLUP_DIMENSIONS:
+            if column in rows.columns:
+                _add_measures(self.by_dimension[column], measures.groupby(rows[column]).sum())
+        if 'major' in rows.columns and 'grade' in rows.columns:
+            _add_measures(self.by_major_grade, measures.groupby([rows['major'], rows['grade']]).sum())
+        if 'student_id' in rows.columns:
+            self.students.update(rows['student_id'].dropna().unique())
+        self.version += 1
+
+    def record(self, row):
+        """Fold in a registration row just saved (as returned by the insert)."""
+        rows = pd.DataFrame([row])
+        if 'timestamp' in rows.columns:
+            rows['timestamp'] = _timestamps(rows)
+        with self._lock:
+            if row.get('id') is not None:
+                if row['id'] in self._recorded:
+                    return
+                self._recorded.add(row['id'])
+            self._fold(rows)
+
+    def sync(self, table):
+        """Catch up with an IncrementalTable's new rows, rebuilding after a full reload.
+
+        Only rows appended since the last sync are read. Rows already folded
+        in by record() are skipped, so the set of recorded ids only holds
+        registrations saved since the table last fetched.
+        """
+        with self._lock:
+            if table.generation != self.generation:
+                self._reset()
+                self.generation = table.generation
+            rows = table.frame.iloc[self.rows_seen:]
+            self.rows_seen += len(rows)
+            if self._recorded and 'id' in rows.columns:
+                seen = rows['id'].isin(self._recorded)
+                self._recorded.difference_update(rows.loc[seen, 'id'])
+                rows = rows[~seen]
+            if not rows.empty:
+                self._fold(rows)
+
+    def totals(self):
+        return {
+            "sessions": self.sessions,
+            "usage_minutes": self.usage_minutes,
+            "avg_usage_minutes": self.usage_minutes / self.usage_count if self.usage_count else 0.0,
+            "unique_students": len(self.students),
+        }
+
+    def _groups(self, columns):
+        """{key: [sessions, usage_minutes, usage_count]} for one dimension or major and grade"""
+        if isinstance(columns, str):
+            return {(key,): measures for key, measures in self.by_dimension[columns].items()}
+        if sorted(columns) != ['grade', 'major']:
+            raise ValueError(f"No rollup for {columns}")
+        if columns[0] == 'major':
+            return self.by_major_grade
+        return {(grade, major): measures for (major, grade), measures in self.by_major_grade.items()}
+
+    def distribution(self, column):
+        """Session counts per value of column, largest first (like value_counts)."""
+        counts = pd.Series({key: measures[0] for key, measures in self.by_dimension[column].items()}, dtype=int)
+        counts.index.name = column
+        return counts[counts > 0].sort_values(ascending=False)
+
+    def usage_by(self, columns):
+        """Average usage minutes and session count per group of columns."""
+        names = [columns] if isinstance(columns, str) else list(columns)
+        records = [(*key, minutes / count, count)
+                   for key, (_, minutes, count) in self._groups(columns).items() if count > 0]
+        return pd.DataFrame(records, columns=[*names, 'Avg Minutes', 'Session Count'])
+
+    def crosstab(self, index, columns):
+        records = [(*key, sessions) for key, (sessions, _, _) in self._groups([index, columns]).items()]
+        table = pd.DataFrame(records, columns=[index, columns, 'sessions'])
+        return table.pivot_table(index=index, columns=columns, values='sessions', aggfunc='sum', fill_value=0)
+
+    def peak_usage(self):
+        """Sessions per weekday x hour, rows in Monday..Sunday order."""
+        table = pd.DataFrame([(date, hour, sessions) for (date, hour), sessions in self.by_hour.items()],
+                             columns=['date', 'hour', 'sessions'])
+        table['day'] = pd.to_datetime(table['date']).dt.day_name()
+        pivot = table.groupby(['day', 'hour'])['sessions'].sum().unstack('hour')
+        return pivot.reindex(DAY_ORDER)
+
+
+_rollup = None
+_rollup_lock = threading.Lock()
+
+
+def get_registration_rollup():
+    """Shared rollup for the process, so registrations saved on the chat page reach the Admin page."""
+    global _rollup
+    with _rollup_lock:
+        if _rollup is None:
+            _rollup = RegistrationRollup()
+        return _rollup
+
+
+def check_rollup(rollup, df):
+    """Compare a rollup against a full recompute from raw rows.
+
+    Returns a list of human-readable mismatches (empty when consistent).
+    Unique students is an estimate, so it only has to be within 2%.
+    """
+    problems = []
+    rows = df[df['timestamp'].notna()]
+    usage = pd.to_numeric(rows['usage_time_minutes'], errors='coerce') if 'usage_time_minutes' in rows.columns else pd.Series(dtype=float)
+    totals = rollup.totals()
+    expected = {
+        "sessions": len(rows),
+        "usage_minutes": float(usage.sum()),
+        "avg_usage_minutes": float(usage.mean()) if usage.notna().any() else 0.0,
+        "unique_students": rows['student_id'].nunique() if 'student_id' in rows.columns else 0,
+    }
+    for name, value in expected.items():
+        rtol = 0.02 if name == "unique_students" else 1e-05
+        if not np.isclose(totals[name], value, rtol=rtol):
+            problems.append(f"{name}: rollup {totals[name]} != raw {value}")
+
+    for column in ROLLUP_DIMENSIONS:
+        if column not in rows.columns:
+            continue
+        raw = rows[column].value_counts().to_dict()
+        rolled = {key: int(value) for key, value in rollup.distribution(column).items()}
+        if raw != rolled:
+            problems.append(f"{column} distribution differs")
+
+    raw_peak = rows.groupby([rows['timestamp'].dt.day_name(), rows['timestamp'].dt.hour]).size()
+    rolled_peak = rollup.peak_usage().stack().dropna()
+    if raw_peak.sort_index().to_dict() != {key: int(value) for key, value in rolled_peak.sort_index().items()}:
+        problems.append("peak usage heatmap differs")
+
+    if 'major' in rows.columns and 'grade' in rows.columns:
+        raw_cross = pd.crosstab(rows['major'], rows['grade'])
+        rolled_cross = rollup.crosstab('major', 'grade').reindex_like(raw_cross).fillna(0)
+        if not np.array_equal(raw_cross.values, rolled_cross.values):
+            problems.append("major x grade crosstab differs")
+    return problems
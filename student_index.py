@@ -0,0 +1,93 @@
+import csv
+import json
+import os
+import threading
+
+from event_log import locked_file
+
+# Account fields kept per student in the lookup index
+ACCOUNT_FIELDS = ["full_name", "student_id", "student_email", "grade", "campus", "major"]
+
+
+def index_key(student_id, student_email):
+    return f"{str(student_id).strip()}|{str(student_email).strip().lower()}"
+
+
+class StudentIndex:
+    """(student_id, lowercased email) -> latest account record, for returning-user login.
+
+    Backed by an append-only JSON-lines file so every process sees new
+    registrations: lookups read only the bytes appended since the last call
+    and then hit an in-memory dict, so cost does not grow with history size.
+    The first use builds the file from the registration CSV if it is missing.
+    """
+
+    def __init__(self, index_path, registrations_path):
+        self._index_path = index_path
+        self._registrations_path = registrations_path
+        self._accounts = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _bootstrap(self):
+        """Build the index file from the registration CSV (one-time full scan)."""
+        accounts = {}
+        if os.path.exists(self._registrations_path):
+            with open(self._registrations_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    email = row.get("student_email") or row.get("email") or ""
+                    if not row.get("student_id") or not email:
+                        continue
+                    account = {field: row.get(field, "") for field in ACCOUNT_FIELDS}
+                    account["student_email"] = email
+                    accounts[index_key(row["student_id"], email)] = account
+        with locked_file(self._index_path) as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                for key, account in accounts.items():
+                    f.write(json.dumps({"key": key, "account": account}) + "\n")
+
+    def _catch_up(self):
+        """Apply entries appended to the index file since the last read."""
+        if not os.path.exists(self._index_path):
+            self._bootstrap()
+        with open(self._index_path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a writer is mid-append; pick it up next time
+                self._offset += len(line)
+                entry = json.loads(line)
+                self._accounts[entry["key"]] = entry["account"]
+
+    def lookup(self, student_id, student_email):
+        """Return the latest account dict for this student, or None."""
+        with self._lock:
+            self._catch_up()
+            account = self._accounts.get(index_key(student_id, student_email))
+        return dict(account) if account else None
+
+    def record(self, account):
+        """Append an account record (latest wins) to the index."""
+        account = {field: str(account.get(field, "") or "") for field in ACCOUNT_FIELDS}
+        if not account["student_id"] or not account["student_email"]:
+            return
+        with self._lock:
+            if not os.path.exists(self._index_path):
+                self._bootstrap()
+        with locked_file(self._index_path) as f:
+            f.write(json.dumps({"key": index_key(account["student_id"], account["student_email"]),
+                                "account": account}) + "\n")
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_student_index(index_path, registrations_path):
+    """Return the process-wide index for index_path."""
+    key = os.path.abspath(index_path)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = StudentIndex(index_path, registrations_path)
+        return _indexes[key]
@@ -1,11 +1,21 @@
 from supabase import create_client
 import os
+import threading
+import time
 import streamlit as st
 from datetime import datetime, timezone
 import pandas as pd
 
-# Initialize Supabase client
-def init_supabase():
+# Shared client for the whole process. The underlying PostgREST session is an
+# httpx.Client, so reusing it keeps connections alive and pooled instead of
+# paying a new TLS handshake on every query.
+_client = None
+_client_lock = threading.Lock()
+# A successful health check is trusted this long, so page reruns skip the round trip
+HEALTH_CHECK_TTL_SECONDS = 5 * 60
+_last_healthy = None
+
+def _create_supabase_client():
     try:
         url = os.environ.get("SUPABASE_URL") or st.secrets.get("SUPABASE_URL")
         key = os.environ.get("SUPABASE_KEY") or st.secrets.get("SUPABASE_KEY")
@@ -18,6 +28,49 @@ def init_supabase():
         st.error(f"Error initializing Supabase client: {str(e)}")
         return None
 
+# Initialize Supabase client (created once per process, then reused)
+def init_supabase():
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            _client = _create_supabase_client()
+        return _client
+
+# Drop the shared client so the next call reconnects
+def reset_supabase():
+    global _client, _last_healthy
+    with _client_lock:
+        _last_healthy = None
+        if _client is not None:
+            try:
+                _client.postgrest.aclose()
+            except Exception:
+                pass
+        _client = None
+
+def check_supabase_health(max_age=HEALTH_CHECK_TTL_SECONDS):
+    """Run a one-row query on the shared client, reconnecting once if it fails.
+
+    Returns True without querying if a check passed within max_age seconds
+    and the client has not been reset since.
+    """
+    global _last_healthy
+    if _last_healthy is not None and time.monotonic() - _last_healthy < max_age:
+        return True
+    for attempt in range(2):
+        supabase = init_supabase()
+        if not supabase:
+            return False
+        try:
+            supabase.table("registrations").select("id").limit(1).execute()
+            _last_healthy = time.monotonic()
+            return True
+        except Exception:
+            reset_supabase()
+    return False
+
 # Save registration data (full session or account-only when course fields are empty)
 def save_registration_data(user_data, start_time=None):
     try:
@@ -98,18 +151,58 @@ def get_student_by_credentials(student_id, email):
         st.error(f"Error looking up student: {str(e)}")
         return None
 
+# Rows requested per page. Paging runs until an empty page, so a lower PostgREST
+# max-rows cap only means more, smaller pages rather than missing rows
+PAGE_SIZE = 1000
+
+def iter_table(table, columns=None, since=None, page_size=PAGE_SIZE, filters=None):
+    """Yield a table as DataFrame pages using keyset pagination on id, until a page comes back empty.
+
+    columns: fetch only these columns (id is always included as the cursor)
+    since: only rows with timestamp at or after this ISO timestamp
+    filters: optional function applied to each query, e.g. lambda q: q.in_("major", majors)
+    """
+    supabase = init_supabase()
+    select = ",".join(dict.fromkeys(["id", *columns])) if columns else "*"
+    last_id = None
+    while True:
+        query = supabase.table(table).select(select)
+        if since:
+            query = query.gte("timestamp", since)
+        if filters:
+            query = filters(query)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        response = query.order("id").limit(page_size).execute()
+        rows = response.data or []
+        if not rows:
+            break
+        yield pd.DataFrame(rows)
+        # A short page does not mean the end: the server's max-rows cap may be below page_size
+        last_id = rows[-1]["id"]
+
+def _parse_timestamps(df, naive=False):
+    if not df.empty and 'timestamp' in df.columns:
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        if naive:
+            df['timestamp'] = df['timestamp'].dt.tz_localize(None)
+    return df
+
+def _concat_pages(pages):
+    pages = list(pages)
+    if not pages:
+        return pd.DataFrame()
+    return pd.concat(pages, ignore_index=True)
+
+# Page through registrations (timestamps converted to timezone-naive)
+def iter_registrations(columns=None, since=None, page_size=PAGE_SIZE, filters=None):
+    for page in iter_table("registrations", columns, since, page_size, filters):
+        yield _parse_timestamps(page, naive=True)
+
 # Get all registrations
-def get_all_registrations():
+def get_all_registrations(columns=None):
     try:
-        supabase = init_supabase()
-        response = supabase.table("registrations").select("*").execute()
-        df = pd.DataFrame(response.data)
-        
-        # Convert timezone-aware timestamps to timezone-naive timestamps
-        if not df.empty and 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp']).dt.tz_localize(None)
-        
-        return df
+        return _concat_pages(iter_registrations(columns))
     except Exception as e:
         st.error(f"Error retrieving registrations: {str(e)}")
         return pd.DataFrame()
@@ -117,34 +210,81 @@ def get_all_registrations():
 # Get filtered registrations
 def get_filtered_registrations(start_date=None, end_date=None, majors=None, campuses=None):
     try:
-        supabase = init_supabase()
-        query = supabase.table("registrations").select("*")
-        
-        if start_date:
-            query = query.gte("timestamp", start_date.isoformat())
-        if end_date:
-            query = query.lte("timestamp", end_date.isoformat())
-        if majors:
-            query = query.in_("major", majors)
-        if campuses:
-            query = query.in_("campus", campuses)
-            
-        response = query.execute()
-        df = pd.DataFrame(response.data)
-        
-        # Convert timezone-aware timestamps to timezone-naive timestamps
-        if not df.empty and 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp']).dt.tz_localize(None)
-        
-        return df
+        def apply_filters(query):
+            if start_date:
+                query = query.gte("timestamp", start_date.isoformat())
+            if end_date:
+                query = query.lte("timestamp", end_date.isoformat())
+            if majors:
+                query = query.in_("major", majors)
+            if campuses:
+                query = query.in_("campus", campuses)
+            return query
+
+        return _concat_pages(iter_registrations(filters=apply_filters))
     except Exception as e:
         st.error(f"Error retrieving filtered registrations: {str(e)}")
         return pd.DataFrame()
 
-# Save feedback
-def save_feedback(rating, topic, difficulty, student_id, course_id):
+# Insert many rows into one table with a single multi-row request
+def save_events(table, rows):
+    rows = [row for row in rows if row]
+    if not rows:
+        return []
     supabase = init_supabase()
-    data = {
+    if not supabase:
+        raise RuntimeError("Supabase is not configured or unreachable")
+    response = supabase.table(table).insert(rows).execute()
+    return response.data or []
+
+def save_event_batch(events):
+    """Insert (table, row) events, one request per table for the whole batch.
+
+    Meant as a telemetry.record target: the background writer hands over
+    everything queued for it (e.g. all logouts in the last flush interval)
+    in one call.
+    """
+    buffer = EventBuffer()
+    for table, row in events:
+        buffer.add(table, row)
+    return buffer.flush()
+
+class EventBuffer:
+    """Queue rows per table and send each table's rows in one insert on flush()"""
+
+    def __init__(self):
+        self._rows = {}
+
+    def add(self, table, row):
+        self._rows.setdefault(table, []).append(row)
+
+    def __len__(self):
+        return sum(len(rows) for rows in self._rows.values())
+
+    def flush(self):
+        """Insert all queued rows (one request per table) and return how many were sent.
+
+        If an insert fails, that table and any not yet sent stay queued, so a
+        later flush() resends only what did not reach the database.
+        """
+        sent = 0
+        for table in list(self._rows):
+            rows = self._rows[table]
+            save_events(table, rows)
+            del self._rows[table]
+            sent += len(rows)
+        return sent
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+# Build a feedback row
+def feedback_row(rating, topic, difficulty, student_id, course_id):
+    return {
         "student_id": student_id,
         "course_id": course_id,
         "rating": rating,
@@ -152,57 +292,64 @@ def save_feedback(rating, topic, difficulty, student_id, course_id):
         "difficulty": difficulty,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
-    supabase.table("feedback").insert(data).execute()
+
+# Save feedback
+def save_feedback(rating, topic, difficulty, student_id, course_id):
+    save_events("feedback", [feedback_row(rating, topic, difficulty, student_id, course_id)])
+
+# Page through feedback
+def iter_feedback(columns=None, since=None, page_size=PAGE_SIZE):
+    for page in iter_table("feedback", columns, since, page_size):
+        yield _parse_timestamps(page)
 
 # Get all feedback
-def get_all_feedback():
-    supabase = init_supabase()
-    response = supabase.table("feedback").select("*").execute()
-    df = pd.DataFrame(response.data)
-    if not df.empty and 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+def get_all_feedback(columns=None):
+    return _concat_pages(iter_feedback(columns))
 
-# Save topic
-def save_topic(topic, difficulty, student_id, course_id):
-    supabase = init_supabase()
-    data = {
+# Build a topic row
+def topic_row(topic, difficulty, student_id, course_id):
+    return {
         "student_id": student_id,
         "course_id": course_id,
         "topic": topic,
         "difficulty": difficulty,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
-    supabase.table("topics").insert(data).execute()
+
+# Save topic
+def save_topic(topic, difficulty, student_id, course_id):
+    save_events("topics", [topic_row(topic, difficulty, student_id, course_id)])
+
+# Page through topics
+def iter_topics(columns=None, since=None, page_size=PAGE_SIZE):
+    for page in iter_table("topics", columns, since, page_size):
+        yield _parse_timestamps(page)
 
 # Get all topics
-def get_all_topics():
-    supabase = init_supabase()
-    response = supabase.table("topics").select("*").execute()
-    df = pd.DataFrame(response.data)
-    if not df.empty and 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+def get_all_topics(columns=None):
+    return _concat_pages(iter_topics(columns))
 
-# Save completion
-def save_completion(completed, student_id, course_id):
-    supabase = init_supabase()
-    data = {
+# Build a completion row
+def completion_row(completed, student_id, course_id):
+    return {
         "student_id": student_id,
         "course_id": course_id,
         "completed": completed,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
-    supabase.table("completions").insert(data).execute()
+
+# Save completion
+def save_completion(completed, student_id, course_id):
+    save_events("completions", [completion_row(completed, student_id, course_id)])
+
+# Page through completions
+def iter_completions(columns=None, since=None, page_size=PAGE_SIZE):
+    for page in iter_table("completions", columns, since, page_size):
+        yield _parse_timestamps(page)
 
 # Get all completions
-def get_all_completions():
-    supabase = init_supabase()
-    response = supabase.table("completions").select("*").execute()
-    df = pd.DataFrame(response.data)
-    if not df.empty and 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+def get_all_completions(columns=None):
+    return _concat_pages(iter_completions(columns))
 
 # OpenAI pricing as of 2025 (in USD per 1M tokens)
 MODEL_PRICING = {
@@ -220,6 +367,22 @@ MODEL_PRICING = {
     }
 }
 
+def api_usage_row(input_tokens, output_tokens, model="gpt-3.5-turbo"):
+    """Build an API usage row with costs calculated from MODEL_PRICING"""
+    input_cost = (input_tokens / 1000000) * MODEL_PRICING[model]["input"]
+    output_cost = (output_tokens / 1000000) * MODEL_PRICING[model]["output"]
+    total_cost = input_cost + output_cost
+
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "model": model,
+        "input_cost": input_cost,
+        "output_cost": output_cost,
+        "total_cost": total_cost,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
 def save_api_usage(input_tokens, output_tokens, model="gpt-3.5-turbo"):
     """Save API usage data to Supabase"""
     try:
@@ -228,23 +391,8 @@ def save_api_usage(input_tokens, output_tokens, model="gpt-3.5-turbo"):
             st.error("Failed to initialize Supabase client")
             return None
 
-        # Calculate cost based on model
-        input_cost = (input_tokens / 1000000) * MODEL_PRICING[model]["input"]
-        output_cost = (output_tokens / 1000000) * MODEL_PRICING[model]["output"]
-        total_cost = input_cost + output_cost
-
-        data = {
-            "input_tokens": input_tokens,
-            "output_tokens": output_tokens,
-            "model": model,
-            "input_cost": input_cost,
-            "output_cost": output_cost,
-            "total_cost": total_cost,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
-        response = supabase.table("api_usage").insert(data).execute()
-        return response.data[0] if response.data else None
+        data = save_events("api_usage", [api_usage_row(input_tokens, output_tokens, model)])
+        return data[0] if data else None
     except Exception as e:
         st.error(f"Error saving API usage: {str(e)}")
         return None
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pandas as pd
+
+# How long a cached table is trusted before a full reload. Watermark deltas only
+# see new rows, so the periodic reload is what picks up edits and deletes.
+CACHE_TTL_SECONDS = 15 * 60
+
+
+def _watermark(frame):
+    """Latest timestamp in frame as a UTC ISO string, or None."""
+    if frame.empty or 'timestamp' not in frame.columns:
+        return None
+    latest = pd.Timestamp(frame['timestamp'].max())
+    if pd.isna(latest):
+        return None
+    if latest.tzinfo is None:
+        latest = latest.tz_localize('UTC')
+    return latest.isoformat()
+
+
+def _concat(pages):
+    pages = [page for page in pages if not page.empty]
+    if not pages:
+        return pd.DataFrame()
+    return pd.concat(pages, ignore_index=True)
+
+
+class IncrementalTable:
+    """Local copy of one table that only fetches rows newer than its watermark.
+
+    loader is one of the supabase_db.iter_* functions; it is called with
+    since=<watermark> for deltas and with no arguments for a full reload.
+    `version` changes whenever the rows change and `generation` changes on
+    every full reload, so downstream caches can key on them.
+    """
+
+    def __init__(self, loader, ttl=CACHE_TTL_SECONDS):
+        self._loader = loader
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self.frame = pd.DataFrame()
+        self.watermark = None
+        self.loaded_at = None
+        self.generation = 0
+        self.version = 0
+
+    def _expired(self):
+        return self.loaded_at is None or time.time() - self.loaded_at > self._ttl
+
+    def _reload(self):
+        self.frame = _concat(self._loader())
+        self.loaded_at = time.time()
+        self.generation += 1
+        self.version += 1
+
+    def _append_delta(self):
+        delta = _concat(self._loader(since=self.watermark))
+        if delta.empty:
+            return
+        # The delta query is inclusive, so rows sharing the watermark timestamp come back again
+        if 'id' in delta.columns and 'id' in self.frame.columns:
+            at_watermark = self.frame['timestamp'] == self.frame['timestamp'].max()
+            delta = delta[~delta['id'].isin(self.frame.loc[at_watermark, 'id'])]
+        if delta.empty:
+            return
+        self.frame = pd.concat([self.frame, delta], ignore_index=True)
+        self.version += 1
+
+    def refresh(self, force=False):
+        """Bring the cached rows up to date and return them.
+
+        The returned frame is a shallow copy, so callers may add or replace
+        columns without touching the cache.
+        """
+        with self._lock:
+            if force or self._expired() or self.watermark is None:
+                self._reload()
+            else:
+                self._append_delta()
+            self.watermark = _watermark(self.frame)
+            return self.frame.copy(deep=False)
@@ -0,0 +1,124 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from event_log import append_events
+
+logger = logging.getLogger(__name__)
+
+# Queue and batching limits for the background writer
+MAX_QUEUE_SIZE = 10000
+BATCH_SIZE = 200
+FLUSH_INTERVAL_SECONDS = 2.0
+
+
+class TelemetryWriter:
+    """Process-wide queue of analytics rows flushed in batches by a daemon thread.
+
+    Rows are grouped by target before writing. A target is either a CSV path
+    (written with event_log.append_events) or a callable that accepts a list
+    of rows, e.g. a bulk Supabase insert. When the queue is full new rows are
+    dropped and counted rather than blocking the page.
+    """
+
+    def __init__(self, max_queue_size=MAX_QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL_SECONDS):
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+            self._thread.start()
+
+    def record(self, target, row):
+        """Queue one row for target without waiting on any I/O."""
+        try:
+            self._queue.put_nowait((target, row))
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        grouped = {}
+        for target, row in batch:
+            grouped.setdefault(target, []).append(row)
+        with self._write_lock:
+            for target, rows in grouped.items():
+                try:
+                    if callable(target):
+                        target(rows)
+                    else:
+                        append_events(target, rows)
+                except Exception:
+                    logger.exception("Failed to write %d telemetry rows to %s", len(rows), target)
+
+    def _run(self):
+        batch = []
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            timeout = max(0.0, self._flush_interval - (time.monotonic() - last_flush))
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+                batch.extend(self._drain(self._batch_size - len(batch)))
+            except queue.Empty:
+                pass
+            if batch and (len(batch) >= self._batch_size
+                          or time.monotonic() - last_flush >= self._flush_interval):
+                self._write(batch)
+                batch = []
+            if not batch:
+                last_flush = time.monotonic()
+        if batch:
+            self._write(batch)
+
+    def flush(self):
+        """Synchronously write everything currently queued."""
+        while True:
+            batch = self._drain(self._batch_size)
+            if not batch:
+                break
+            self._write(batch)
+
+    def close(self, timeout=5.0):
+        """Stop the flusher thread and write whatever is still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the shared writer, starting its flusher thread on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = TelemetryWriter()
+            _writer.start()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def record(target, row):
+    """Queue an analytics row for background writing to target."""
+    get_writer().record(target, row)
@@ -0,0 +1,31 @@
+import io
+
+from extractors import TABLE_FULL_ROWS, extract_text, read_csv_frame, read_table_rows
+
+
+def test_rows_wider_than_header_keep_first_column():
+    # pandas would otherwise make the first column the index and shift a/b
+    df = read_csv_frame(io.BytesIO(b"a,b\n1,2,3\n4,5,6\n"))
+    assert list(df.columns) == ["a", "b", "Unnamed: 2"]
+    assert df["a"].tolist() == [1, 4]
+    assert df["Unnamed: 2"].tolist() == [3, 6]
+
+
+def test_large_csv_wider_than_header_is_summarized_by_its_own_columns():
+    data = b"a,b\n" + b"".join(b"1,%d,%d\n" % (i, i) for i in range(TABLE_FULL_ROWS + 1))
+    text = extract_text("grades.csv", data)
+    assert "- a (int64, 201 non-empty): min 1, max 1" in text
+    assert f"- b (int64, 201 non-empty): min 0, max {TABLE_FULL_ROWS}" in text
+
+
+def test_row_range_keeps_first_column():
+    text = read_table_rows("grades.csv", b"a,b\n1,2,3\n4,5,6\n", 2, 2)
+    assert text.splitlines()[-1].split() == ["2", "4", "5", "6"]
+
+
+def test_ragged_and_empty_csv():
+    assert extract_text("ragged.csv", b"a,b\n1,2\n3,4,5\n") == "a, b\n1, 2\n3, 4, 5\n"
+    assert extract_text("empty.csv", b"") == ""
+    assert read_csv_frame(io.BytesIO(b"")).empty
+    df = read_csv_frame(io.BytesIO(b"a,b\n1,2\n3,4,5\n"))
+    assert df.shape == (2, 3)